@@ -0,0 +1,120 @@
+# artifact_cache.py — memoized download files, keyed by the content of the frames they export
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+from stage_cache import fingerprint
+
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """
+    ``stage_cache.fingerprint(df)``, hashed once per frame object.
+
+    Pages keep their results in session state and rerun on every widget
+    change; remembering the hash by object identity keeps those reruns from
+    hashing the same frames again. Frames handed here must not be modified
+    in place afterwards.
+    """
+    with _fingerprints_lock:
+        entry = _fingerprints.get(id(df))
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+    digest = fingerprint(df)
+    with _fingerprints_lock:
+        for key in [k for k, (ref, _) in _fingerprints.items() if ref() is None]:
+            del _fingerprints[key]
+        _fingerprints[id(df)] = (weakref.ref(df), digest)
+    return digest
+
+
+class ArtifactCache:
+    """
+    Least-recently-used export files (bytes), kept under ``max_bytes``.
+
+    An entry is keyed by the fingerprints of the frame, or tuple of frames,
+    it was made from and the artifact's ``kind`` (format, sheet name, ...),
+    so a rerun with the same results reuses the file, whichever session asks
+    for it. Each entry remembers how long it took to build; a ``stats`` dict
+    passed to ``get`` or ``get_or_build`` receives its ``seconds`` and
+    ``bytes``.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(frames, kind: str) -> tuple:
+        frames = frames if isinstance(frames, tuple) else (frames,)
+        return tuple(frame_fingerprint(df) for df in frames), kind
+
+    def get(self, frames, kind: str, stats: dict | None = None) -> bytes | None:
+        """The cached artifact, or None if it has not been built for this content."""
+        key = self.make_key(frames, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        if stats is not None:
+            stats.update(seconds=entry[1], bytes=len(entry[0]))
+        return entry[0]
+
+    def put(self, frames, kind: str, body: bytes, seconds: float = 0.0):
+        key = self.make_key(frames, kind)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            if len(body) > self.max_bytes:
+                return
+            self._entries[key] = (body, seconds)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get_or_build(self, frames, kind: str, build, stats: dict | None = None) -> bytes:
+        """The cached artifact, or ``build()``'s bytes, which are then cached."""
+        body = self.get(frames, kind, stats)
+        if body is None:
+            start = time.perf_counter()
+            body = build()
+            seconds = time.perf_counter() - start
+            self.put(frames, kind, body, seconds)
+            if stats is not None:
+                stats.update(seconds=seconds, bytes=len(body))
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_artifact_cache() -> ArtifactCache:
+    """Return the process-wide artifact cache, sized from ARTIFACT_CACHE_MAX_MB."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ArtifactCache(
+                    max_bytes=int(float(os.getenv("ARTIFACT_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 ** 2))
+                                  * 1024 ** 2),
+                )
+    return _cache
@@ -0,0 +1,75 @@
+"""
+Compare the direct-DB loader with the HTTP /store_data path.
+
+    python benchmarks/bench_db_loader.py --rows 1000000
+
+The same synthetic frame is written to a SQLite stand-in for dbo.Product_Data
+and served by the local stand-in API on localhost, so the numbers compare
+the transfer and decode paths rather than two different databases.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def _time(fn, repeat: int) -> tuple:
+    best, rows = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(fn())
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--port", type=int, default=5091)
+    args = parser.parse_args()
+
+    from werkzeug.serving import make_server
+
+    import db_loader
+    import local_api
+    from store_api import load_store_data, make_aggregate
+    from synthetic_data import make_store_data
+
+    data = make_store_data(args.rows)
+    local_api._STORE_DATA = data
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", args.port, local_api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{args.port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "product_data.db")
+        db_loader.write_sqlite_stand_in(path, data)
+        pool = db_loader.ConnectionPool(lambda: db_loader.connect_sqlite(path))
+        payload = {"user_id": 1}
+        aggregated = dict(payload, aggregate=make_aggregate("2024-01-01"))
+
+        runs = {
+            "http json": lambda: load_store_data(api_url, payload, wire_format="json"),
+            "http arrow": lambda: load_store_data(api_url, payload, wire_format="arrow"),
+            "db (sqlite)": lambda: db_loader.load_store_data_db(payload, pool=pool),
+            "http agg": lambda: load_store_data(api_url, aggregated, wire_format="arrow"),
+            "db agg": lambda: db_loader.load_store_data_db(aggregated, pool=pool),
+        }
+        print(f"{'path':<12} {'rows':>10} {'best s':>8}")
+        for name, fn in runs.items():
+            seconds, rows = _time(fn, args.repeat)
+            print(f"{name:<12} {rows:>10,} {seconds:>8.2f}")
+        pool.close_all()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Time the .xlsx download of the processed and transfer sheets, and its peak memory, old writer against streaming.
+
+    python benchmarks/bench_excel_export.py
+    python benchmarks/bench_excel_export.py --rows 100k --repeat 3 --batch-rows 5000
+
+The sheets are the Network ``run_pipeline`` result for
+``synthetic_data.make_store_grid`` data, cut to ``--rows`` rows each.
+``pandas`` is the pages' former ``to_excel``: ``pd.ExcelWriter`` with
+xlsxwriter in its default mode into a ``BytesIO``. ``streaming`` is
+``excel_export.to_excel_bytes``. Seconds are the best of ``--repeat``
+untraced runs; ``peak MB`` comes from one more run under tracemalloc and
+counts every Python and numpy allocation the export makes, the workbook
+bytes included. Both files are read back and must hold the same cells.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+THRESHOLD_DATE = "2023-06-01"
+SELL_THROUGH_THRESHOLD = 60
+DAYS_THRESHOLD = 30
+NOW = datetime(2025, 9, 1)
+
+
+def pandas_excel(df, sheet_name):
+    import pandas as pd
+
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name=sheet_name)
+    return output.getvalue()
+
+
+def streaming_excel(batch_rows):
+    from excel_export import to_excel_bytes
+
+    def write(df, sheet_name):
+        return to_excel_bytes(df, sheet_name, batch_rows)
+    return write
+
+
+def measure(write, df, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = write(df, "Sheet1")
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+
+    tracemalloc.start()
+    try:
+        write(df, "Sheet1")
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": best, "peak": peak, "bytes": len(body), "body": body}
+
+
+def assert_same_cells(expected: bytes, actual: bytes):
+    import pandas as pd
+
+    want = pd.read_excel(BytesIO(expected), engine="openpyxl")
+    got = pd.read_excel(BytesIO(actual), engine="openpyxl")
+    pd.testing.assert_frame_equal(want, got, check_dtype=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="500k", help="rows per sheet, e.g. 100k or 500000")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--batch-rows", type=int, default=None, help="streaming batch size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-check", action="store_true", help="skip reading the files back")
+    args = parser.parse_args()
+
+    from bench_pipeline_stages import parse_size
+    from excel_export import BATCH_ROWS
+    from synthetic_data import make_store_grid
+    from transfer_engine import run_pipeline
+
+    rows = parse_size(args.rows)
+    data = make_store_grid(rows * 2, seed=args.seed)
+    sheets = dict(zip(("processed", "transfers"),
+                      run_pipeline(data, THRESHOLD_DATE, SELL_THROUGH_THRESHOLD, DAYS_THRESHOLD, now=NOW)))
+    del data
+    writers = {"pandas": pandas_excel, "streaming": streaming_excel(args.batch_rows or BATCH_ROWS)}
+
+    print(f"{'sheet':<10} {'rows':>9} {'cols':>5} {'writer':<10} {'seconds':>8} {'peak MB':>8} {'file MB':>8}")
+    for name, df in sheets.items():
+        df = df.head(rows)
+        results = {}
+        for writer, write in writers.items():
+            r = results[writer] = measure(write, df, args.repeat)
+            print(f"{name:<10} {len(df):>9,} {df.shape[1]:>5} {writer:<10} {r['seconds']:>8.2f} "
+                  f"{r['peak'] / 1e6:>8.1f} {r['bytes'] / 1e6:>8.1f}")
+        old, new = results["pandas"], results["streaming"]
+        print(f"{'':<27} streaming: {new['seconds'] / old['seconds'] - 1:+.0%} time, "
+              f"{new['peak'] / old['peak'] - 1:+.0%} peak memory")
+        if not args.no_check:
+            assert_same_cells(old["body"], new["body"])
+    if not args.no_check:
+        print("Both writers wrote the same cells.")
+
+
+if __name__ == "__main__":
+    main()
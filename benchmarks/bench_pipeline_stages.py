@@ -0,0 +1,159 @@
+"""
+Time each transfer-pipeline stage and the whole run per data size and mode, and keep the results per commit.
+
+    python benchmarks/bench_pipeline_stages.py
+    python benchmarks/bench_pipeline_stages.py --sizes 10k,1m,10m --repeat 1
+    python benchmarks/bench_pipeline_stages.py --compare HEAD~3
+    python benchmarks/bench_pipeline_stages.py --lean --memory
+
+Data comes from ``synthetic_data.make_store_grid`` (fixed seed), so the
+same size is the same frame on every commit. Every stage is timed through
+``stage_profile.StageProfile`` with the stage cache off; a stage's figure
+is its best over ``--repeat`` runs and ``total`` is the best end-to-end
+run. Each invocation appends one JSON line per (size, mode, stage) to
+``--out`` tagged with the current commit (``+dirty`` for uncommitted
+changes). ``--compare REV`` prints these timings next to the latest ones
+recorded for REV. ``--lean`` runs ``run_pipeline(lean=True)`` and
+``--memory`` adds one untimed tracemalloc run, recording each stage's peak
+allocation (``total`` gets the largest).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "pipeline_stages.jsonl")
+
+THRESHOLD_DATE = "2023-06-01"
+SELL_THROUGH_THRESHOLD = 60
+DAYS_THRESHOLD = 30
+NOW = datetime(2025, 9, 1)
+
+# Page name -> partition, as the pages pass it
+MODES = {"Network": None, "City": "City", "Regional": "Zone"}
+
+
+def parse_size(text: str) -> int:
+    """``10k`` -> 10_000, ``1m`` -> 1_000_000; plain numbers pass through."""
+    text = text.strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def git_commit(rev: str = "HEAD", mark_dirty: bool = False) -> str:
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    commit = subprocess.run(["git", "rev-parse", "--short", rev], cwd=root, capture_output=True, text=True,
+                            check=True).stdout.strip()
+    if mark_dirty:
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True).stdout.strip()
+        commit += "+dirty" if dirty else ""
+    return commit
+
+
+def time_stages(data, partition, repeat: int, lean: bool = False, memory: bool = False) -> dict:
+    """
+    Best seconds per stage over ``repeat`` runs, plus ``total``; with each
+    stage's rows in and out, and its ``memory_peak`` when ``memory`` is set.
+    """
+    from stage_profile import StageProfile
+    from transfer_engine import run_pipeline
+
+    def run(profile):
+        run_pipeline(data, THRESHOLD_DATE, SELL_THROUGH_THRESHOLD, DAYS_THRESHOLD, partition=partition, now=NOW,
+                     profile=profile, lean=lean)
+
+    best = {}
+    for _ in range(repeat):
+        profile = StageProfile()
+        start = time.perf_counter()
+        run(profile)
+        records = profile.records + [{"stage": "total", "seconds": time.perf_counter() - start,
+                                      "rows_in": len(data), "rows_out": None}]
+        for r in records:
+            kept = best.get(r["stage"])
+            if kept is None or r["seconds"] < kept["seconds"]:
+                best[r["stage"]] = {k: r[k] for k in ("seconds", "rows_in", "rows_out")}
+
+    if memory:
+        profile = StageProfile("tracemalloc")
+        try:
+            run(profile)
+        finally:
+            profile.close()
+        for r in profile.records:
+            best[r["stage"]]["memory_peak"] = r["memory_peak"]
+        best["total"]["memory_peak"] = max(r["memory_peak"] for r in profile.records)
+    return best
+
+
+def load_results(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def latest_for(results: list, commit: str) -> dict:
+    """``{(rows, mode, lean, stage): seconds}`` from the most recent run recorded for ``commit``."""
+    runs = [r for r in results if r["commit"] == commit]
+    if not runs:
+        return {}
+    last = max(r["run"] for r in runs)
+    return {(r["rows"], r["mode"], r.get("lean", False), r["stage"]): r["seconds"] for r in runs if r["run"] == last}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10k,1m", help="comma-separated row counts, e.g. 10k,1m,10m")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated pages: Network,City,Regional")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lean", action="store_true", help="run the pipeline with lean=True")
+    parser.add_argument("--memory", action="store_true", help="also record each stage's peak allocation")
+    parser.add_argument("--out", default=RESULTS, help="JSON-lines file the results are appended to")
+    parser.add_argument("--compare", metavar="REV", help="show the latest results recorded for this commit")
+    args = parser.parse_args()
+
+    from synthetic_data import make_store_grid
+
+    commit = git_commit(mark_dirty=True)
+    baseline = latest_for(load_results(args.out), git_commit(args.compare)) if args.compare else {}
+    run = datetime.now().isoformat(timespec="seconds")
+    lines = []
+
+    print(f"{'rows':>10} {'mode':<9} {'stage':<12} {'rows in':>10} {'rows out':>10} {'seconds':>9}"
+          + (f" {'peak MB':>8}" if args.memory else "")
+          + (f" {args.compare:>9} {'change':>7}" if args.compare else ""))
+    for size in (parse_size(s) for s in args.sizes.split(",")):
+        data = make_store_grid(size, seed=args.seed)
+        for mode in args.modes.split(","):
+            for stage, r in time_stages(data, MODES[mode], args.repeat, args.lean, args.memory).items():
+                lines.append({"run": run, "commit": commit, "python": platform.python_version(),
+                              "machine": platform.node(), "rows": size, "mode": mode, "lean": args.lean,
+                              "stage": stage, **r})
+                rows_out = f"{r['rows_out']:,}" if r["rows_out"] is not None else ""
+                line = f"{size:>10,} {mode:<9} {stage:<12} {r['rows_in']:>10,} {rows_out:>10} {r['seconds']:>9.3f}"
+                if args.memory:
+                    line += f" {r.get('memory_peak', 0) / 1e6:>8.1f}"
+                before = baseline.get((size, mode, args.lean, stage))
+                if before:
+                    line += f" {before:>9.3f} {r['seconds'] / before - 1:>+7.0%}"
+                print(line)
+        del data
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line) + "\n")
+    print(f"Appended {len(lines)} results for {commit} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Time the per-store pick-list zip for growing store counts and worker threads.
+
+    python benchmarks/bench_store_slips.py
+    python benchmarks/bench_store_slips.py --stores 100,300,1000 --workers 1,2,4,8 --pairs
+
+Transfers come from the Network ``run_pipeline`` result for
+``synthetic_data.make_store_grid`` data with ``--stores`` stores. Each line
+is the best of ``--repeat`` runs of ``data_export.store_slips_bytes``, by
+From Store, or by From and To Store with ``--pairs``. Every zip must hold
+exactly the transfer rows, one uniquely named entry per slip, whatever the
+worker count; store names that clean up to the same file name are checked
+first.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+THRESHOLD_DATE = "2023-06-01"
+SELL_THROUGH_THRESHOLD = 60
+DAYS_THRESHOLD = 30
+NOW = datetime(2025, 9, 1)
+
+
+def slip_rows(body: bytes) -> int:
+    import io
+    import zipfile
+
+    with zipfile.ZipFile(io.BytesIO(body)) as bundle:
+        return sum(bundle.read(name).count(b"\n") - 1 for name in bundle.namelist())
+
+
+def slip_entries(body: bytes) -> list:
+    import io
+    import zipfile
+
+    with zipfile.ZipFile(io.BytesIO(body)) as bundle:
+        return bundle.namelist()
+
+
+def check_colliding_names(workers: int):
+    """Stores whose names clean up to the same file name still get one zip entry each."""
+    import pandas as pd
+
+    from data_export import store_slips_bytes
+
+    stores = ["A/B", "A:B", "a?b", "A_B", "A_B (2)"]
+    transfers = pd.DataFrame({"From Store": stores * 2, "To Store": ["Z"] * 10, "Quantity Transferred": range(10)})
+    for by in (("From Store",), ("From Store", "To Store")):
+        body = store_slips_bytes(transfers, by, workers)
+        names = slip_entries(body)
+        assert len(names) == len(stores), f"{len(names)} slips for {len(stores)} stores: {names}"
+        assert len({n.casefold() for n in names}) == len(names), f"duplicate zip entries: {names}"
+        assert slip_rows(body) == len(transfers), "pick lists do not hold every transfer row"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="1m", help="generated input rows per store count")
+    parser.add_argument("--stores", default="60,300,1000", help="comma-separated store counts")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated thread counts")
+    parser.add_argument("--pairs", action="store_true", help="one slip per From and To Store pair")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from bench_pipeline_stages import parse_size
+    from data_export import store_slips_bytes
+    from synthetic_data import make_store_grid
+    from transfer_engine import run_pipeline
+
+    for workers in (int(w) for w in args.workers.split(",")):
+        check_colliding_names(workers)
+
+    by = ("From Store", "To Store") if args.pairs else ("From Store",)
+    print(f"{os.cpu_count()} CPUs; slips by {' and '.join(by)}")
+    print(f"{'stores':>7} {'transfers':>10} {'slips':>7} {'workers':>8} {'seconds':>8} {'zip MB':>7}")
+    for stores in (int(s) for s in args.stores.split(",")):
+        data = make_store_grid(parse_size(args.rows), n_stores=stores, seed=args.seed)
+        _, transfers = run_pipeline(data, THRESHOLD_DATE, SELL_THROUGH_THRESHOLD, DAYS_THRESHOLD, now=NOW)
+        del data
+        slips = transfers.groupby(list(by), observed=True).ngroups
+        for workers in (int(w) for w in args.workers.split(",")):
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                body = store_slips_bytes(transfers, by, workers)
+                seconds = time.perf_counter() - start
+                best = seconds if best is None else min(best, seconds)
+            assert slip_rows(body) == len(transfers), "pick lists do not hold every transfer row"
+            assert len(set(slip_entries(body))) == slips, "pick lists are not one zip entry per slip"
+            print(f"{stores:>7} {len(transfers):>10,} {slips:>7,} {workers:>8} {best:>8.2f} {len(body) / 1e6:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
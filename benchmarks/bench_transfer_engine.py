@@ -0,0 +1,124 @@
+"""
+Time the transfer pipeline for Network, City and Zone and check it against the old page code.
+
+    python benchmarks/bench_transfer_engine.py --rows 1000000
+    python benchmarks/bench_transfer_engine.py --rows 50000 --legacy
+    python benchmarks/bench_transfer_engine.py --rows 2000000 --workers 4
+    python benchmarks/bench_transfer_engine.py --rows 2000000 --chunk-rows 100000 --budget-mb 256
+
+The input is synthetic store data passed through the loader's normalize and
+compact steps, so the engine sees the dtypes the pages give it. With
+``--legacy`` each mode is also run through the pre-engine copy in
+benchmarks/legacy/, and both result frames must match exactly. With
+``--workers`` the process-pool mode is timed as well and must match the
+single-process result. With ``--chunk-rows`` the data is also fed to
+``run_pipeline_chunked`` in slices of that many rows, within ``--budget-mb``,
+and must match as well.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+THRESHOLD_DATE = "2023-06-01"
+SELL_THROUGH_THRESHOLD = 20
+DAYS_THRESHOLD = 30
+
+
+def _plain(df):
+    """Categoricals as objects and a fresh index, so frames compare by value."""
+    df = df.reset_index(drop=True)
+    return df.astype({c: object for c in df.columns if df[c].dtype == "category"})
+
+
+def assert_same_result(expected: tuple, actual: tuple):
+    import pandas as pd
+
+    for name, want, got in zip(("filtered_data", "transfer_details"), expected, actual):
+        if want.empty and got.empty:
+            continue
+        try:
+            pd.testing.assert_frame_equal(_plain(want), _plain(got), check_dtype=False)
+        except AssertionError as e:
+            raise AssertionError(f"{name} differs from the legacy pipeline: {e}") from None
+
+
+def run_legacy(mode: str, data, *args):
+    from legacy import network, partitioned
+
+    if mode == "Network":
+        return network.run(data, *args)
+    partitioned.PARTITION = mode
+    return partitioned.run(data, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy", action="store_true", help="also time the old page code and check parity")
+    parser.add_argument("--workers", type=int, default=0, help="also time run_pipeline(workers=N)")
+    parser.add_argument("--chunk-rows", type=int, default=0, help="also time run_pipeline_chunked on N-row slices")
+    parser.add_argument("--budget-mb", type=float, default=None, help="max_bytes for the chunked run, in MB")
+    args = parser.parse_args()
+
+    from store_api import compact_store_frame, normalize_store_frame
+    from synthetic_data import make_store_data
+    from transfer_engine import PARTITIONS, run_pipeline, run_pipeline_chunked
+
+    raw = normalize_store_frame(make_store_data(args.rows))
+    data = compact_store_frame(raw.copy())
+    thresholds = (THRESHOLD_DATE, SELL_THROUGH_THRESHOLD, DAYS_THRESHOLD)
+
+    def best_of(**kwargs):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = run_pipeline(data.copy(), *thresholds, **kwargs)
+            best = min(best, time.perf_counter() - start)
+        return result, best
+
+    def chunks():
+        # Compacted slice by slice, as the loaders' page iterators deliver them
+        for start in range(0, len(raw), args.chunk_rows):
+            yield compact_store_frame(raw.iloc[start:start + args.chunk_rows].copy())
+
+    print(f"{'mode':<8} {'rows':>10} {'transfers':>10} {'engine s':>9} {'parallel s':>11} {'chunked s':>10} "
+          f"{'peak MB':>8} {'legacy s':>9}")
+    for mode, partition in PARTITIONS.items():
+        now = datetime.now()
+        result, best = best_of(partition=partition, now=now)
+
+        parallel_s = ""
+        if args.workers > 1:
+            parallel, seconds = best_of(partition=partition, now=now, workers=args.workers, parallel_min_rows=0)
+            parallel_s = f"{seconds:.2f}"
+            assert_same_result(result, parallel)
+
+        chunked_s = peak_mb = ""
+        if args.chunk_rows:
+            stats = {}
+            max_bytes = int(args.budget_mb * 1024 ** 2) if args.budget_mb else None
+            start = time.perf_counter()
+            chunked = run_pipeline_chunked(chunks(), *thresholds, partition=partition, now=now,
+                                           max_bytes=max_bytes, stats=stats)
+            chunked_s = f"{time.perf_counter() - start:.2f}"
+            peak_mb = f"{stats['peak_bytes'] / 1e6:.0f}"
+            assert_same_result(result, chunked)
+
+        legacy_s = ""
+        if args.legacy:
+            start = time.perf_counter()
+            expected = run_legacy(mode, data.copy(), *thresholds)
+            legacy_s = f"{time.perf_counter() - start:.2f}"
+            assert_same_result(expected, result)
+
+        print(f"{mode:<8} {len(result[0]):>10,} {len(result[1]):>10,} {best:>9.2f} {parallel_s:>11} {chunked_s:>10} "
+              f"{peak_mb:>8} {legacy_s:>9}")
+
+
+if __name__ == "__main__":
+    main()
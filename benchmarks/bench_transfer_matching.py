@@ -0,0 +1,97 @@
+"""
+Time transfer matching on a large candidate frame and check it against the greedy walk.
+
+    python benchmarks/bench_transfer_matching.py --rows 200000
+    python benchmarks/bench_transfer_matching.py --rows 20000 --legacy
+
+Candidates are random (SKU, store, Transfer in/out) rows, mostly one per
+(SKU, store) pair: the shape filter_data hands to process_transfer_details. ``match_transfers`` must give
+the same transfers as ``_match_sequentially`` run over every group; with
+``--legacy`` the old iterrows matcher from the Network page is timed too and
+must agree as well.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def make_candidates(n_rows: int, n_skus: int, n_stores: int, dup_rate: float = 0.01, seed: int = 0):
+    """
+    Random candidate rows, one per (SKU, store) except for a ``dup_rate`` share
+    that repeat a pair, as an older receive date at the same store would.
+    """
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    n_dups = int(n_rows * dup_rate)
+    pairs = rng.choice(n_skus * n_stores, n_rows - n_dups, replace=False)
+    pairs = np.concatenate([pairs, rng.choice(pairs, n_dups)])
+    rng.shuffle(pairs)
+    sku, store = 1_000_000 + pairs // n_stores, pairs % n_stores
+
+    qty = rng.integers(-40, 41, n_rows)
+    qty[qty == 0] = 1
+    return pd.DataFrame({
+        "UPC_Barcode_SKU": sku,
+        "STORE_NAME": pd.Categorical(np.array([f"Store{i:03d}" for i in range(n_stores)])[store]),
+        "DESIGN": sku // 20,
+        "Size": "M",
+        "Color": "Red",
+        "Volume": "Casual",
+        "product_type": "Lawn",
+        "Transfer in/out": qty,
+    })
+
+
+def _time(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--skus", type=int, default=20_000)
+    parser.add_argument("--stores", type=int, default=60)
+    parser.add_argument("--dup-rate", type=float, default=0.01, help="share of rows repeating a (SKU, store) pair")
+    parser.add_argument("--legacy", action="store_true", help="also time the old iterrows matcher")
+    args = parser.parse_args()
+
+    import numpy as np
+    import pandas as pd
+
+    from transfer_engine import _match_sequentially, match_transfers, process_transfer_details
+
+    df = make_candidates(args.rows, args.skus, args.stores, args.dup_rate)
+    group = df.groupby("UPC_Barcode_SKU", sort=False).ngroup().to_numpy()
+    store, _ = pd.factorize(df["STORE_NAME"])
+    qty = df["Transfer in/out"].to_numpy(dtype=np.int64)
+
+    matched, matched_s = _time(lambda: match_transfers(group, store, qty))
+    walked, walked_s = _time(lambda: _match_sequentially(
+        group, store, qty, np.flatnonzero(qty < 0), np.flatnonzero(qty > 0)))
+    for got, want in zip(matched, walked):
+        np.testing.assert_array_equal(got, want)
+
+    print(f"{'matcher':<14} {'candidates':>11} {'transfers':>10} {'seconds':>8}")
+    print(f"{'vectorized':<14} {len(df):>11,} {len(matched[0]):>10,} {matched_s:>8.3f}")
+    print(f"{'walk':<14} {len(df):>11,} {len(walked[0]):>10,} {walked_s:>8.3f}")
+
+    if args.legacy:
+        from bench_transfer_engine import assert_same_result
+        from legacy import network
+
+        details, details_s = _time(lambda: process_transfer_details(df))
+        expected, legacy_s = _time(lambda: network.process_transfer_details(df))
+        assert_same_result((df, expected), (df, details))
+        print(f"{'page (engine)':<14} {len(df):>11,} {len(details):>10,} {details_s:>8.3f}")
+        print(f"{'page (legacy)':<14} {len(df):>11,} {len(expected):>10,} {legacy_s:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare decode time and peak RSS of the /store_data wire formats.
+
+    python benchmarks/bench_wire_format.py --rows 1000000
+
+Each body is encoded once by the local stand-in API, written to a temp file,
+and decoded by the client's decoders in a fresh subprocess so the peak RSS of
+one format does not leak into the next.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+FORMATS = ["json", "arrow", "parquet"]
+
+
+def _max_rss_mb() -> float:
+    # VmHWM is reset on exec; ru_maxrss can carry over the parent's peak
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _decode(fmt: str, path: str) -> dict:
+    import pandas as pd
+    from store_api import iter_arrow_frames, iter_parquet_frames, json_frame
+
+    with open(path, "rb") as f:
+        body = f.read()
+    baseline = _max_rss_mb()
+
+    start = time.perf_counter()
+    if fmt == "json":
+        df = json_frame(json.loads(body))
+    else:
+        import pyarrow as pa
+        frames = iter_arrow_frames(pa.BufferReader(body)) if fmt == "arrow" else iter_parquet_frames(pa.BufferReader(body))
+        df = pd.concat(list(frames), ignore_index=True)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "format": fmt,
+        "rows": len(df),
+        "body_mb": round(len(body) / 1e6, 1),
+        "decode_s": round(elapsed, 3),
+        "peak_rss_mb": round(_max_rss_mb(), 1),
+        "decode_rss_mb": round(_max_rss_mb() - baseline, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--child", nargs=2, metavar=("FORMAT", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_decode(*args.child)))
+        return
+
+    from local_api import encode_arrow, encode_json, encode_parquet
+    from synthetic_data import make_store_data
+
+    df = make_store_data(args.rows)
+    encoders = {
+        "json": lambda: encode_json(df, total_rows=len(df)).encode(),
+        "arrow": lambda: encode_arrow(df),
+        "parquet": lambda: encode_parquet(df),
+    }
+
+    print(f"{'format':<8} {'rows':>10} {'body MB':>8} {'decode s':>9} {'peak RSS MB':>12} {'decode RSS MB':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in FORMATS:
+            path = os.path.join(tmp, f"body.{fmt}")
+            with open(path, "wb") as f:
+                f.write(encoders[fmt]())
+            out = subprocess.run([sys.executable, __file__, "--child", fmt, path],
+                                 check=True, capture_output=True, text=True).stdout
+            r = json.loads(out)
+            print(f"{r['format']:<8} {r['rows']:>10,} {r['body_mb']:>8} {r['decode_s']:>9} "
+                  f"{r['peak_rss_mb']:>12} {r['decode_rss_mb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
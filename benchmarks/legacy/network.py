@@ -0,0 +1,213 @@
+"""
+The Network page pipeline as it stood before transfer_engine.py, the parity
+reference for benchmarks/bench_transfer_engine.py and
+tests/test_transfer_engine_parity.py.
+
+The stage functions are the page's code with these changes only:
+
+- Streamlit error calls raise ``ValueError`` instead;
+- the multi-key ``groupby`` in ``aggregate_data`` passes ``observed=True``,
+  so categorical key columns (the loader's compact schema) group like the
+  object columns the page was written for, instead of producing every
+  combination of categories;
+- ``run`` is new: the call sequence from the page.
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+
+def adjust_date(df, threshold_date):
+    if 'first_rcv_date' in df.columns:
+        df['first_rcv_date'] = pd.to_datetime(df['first_rcv_date'], errors='coerce')
+    else:
+        raise ValueError("'first_rcv_date' column is missing.")
+        return df
+
+    threshold_timestamp = pd.Timestamp(threshold_date)
+    df['Adjusted_first_Rcv_Date'] = df['first_rcv_date'].apply(
+        lambda date: threshold_timestamp if pd.notnull(date) and date <= threshold_timestamp else date
+    )
+    
+    return df
+
+def aggregate_data(df, threshold_date):
+    df = adjust_date(df, threshold_date)
+    required_columns = ['UPC_Barcode_SKU', 'STORE_NAME', 'DESIGN', 'Adjusted_first_Rcv_Date', 'Volume', 'product_type', 'Size', 'Color']
+    for col in required_columns:
+        if col not in df.columns:
+            raise ValueError(f"Error: '{col}' column is missing in the data.")
+            return df
+
+    return df.groupby(required_columns, observed=True).agg({
+        'Shop_Rcv_Qty': 'sum',
+        'Disp_Qty': 'sum',
+        'OH_Qty': 'sum',
+        'Sold_Qty': 'sum'
+    }).reset_index()
+
+def calculate_sell_through(df):
+    if 'Shop_Rcv_Qty' not in df.columns or 'Disp_Qty' not in df.columns or 'Sold_Qty' not in df.columns:
+        raise ValueError("Error: Required columns for calculating sell-through are missing.")
+        return df
+    sell_through = (df['Sold_Qty'] / (df['Shop_Rcv_Qty'] - df['Disp_Qty']) * 100).replace([np.inf, -np.inf, np.nan], 0)
+    df['shop Sell Through'] = sell_through.astype(int)
+    
+    return df
+
+def calculate_days(df):
+    if 'Adjusted_first_Rcv_Date' not in df.columns:
+        raise ValueError("Error: 'Adjusted_first_Rcv_Date' column is missing.")
+        return df
+
+    current_date = datetime.now()
+    df['Shop Days'] = (current_date - df['Adjusted_first_Rcv_Date']).dt.days
+    
+    return df
+
+
+def calculate_design_sell_through(df):
+    if 'UPC_Barcode_SKU' not in df.columns:
+        raise ValueError("Error: 'UPC_Barcode_SKU' column is missing.")
+        return df
+
+    df['Net Receiving'] = df['Shop_Rcv_Qty'] - df['Disp_Qty']
+    design_totals = df.groupby('UPC_Barcode_SKU').agg({'Sold_Qty': 'sum', 'Net Receiving': 'sum'}).reset_index()
+    design_totals['design Sell Through'] = (design_totals['Sold_Qty'] / design_totals['Net Receiving'] * 100).replace([np.inf, -np.inf, np.nan], 0).astype(int)
+
+    
+    return design_totals
+
+def merge_data(desired_df, design_totals):
+    if 'UPC_Barcode_SKU' not in desired_df.columns or 'UPC_Barcode_SKU' not in design_totals.columns:
+        raise ValueError("Error: 'UPC_Barcode_SKU' column is missing in one of the DataFrames.")
+        return desired_df
+
+    if 'design Sell Through' not in design_totals.columns:
+        raise ValueError("Error: 'design Sell Through' column is missing in design_totals.")
+        return desired_df
+
+    merged_df = pd.merge(desired_df, design_totals[['UPC_Barcode_SKU', 'design Sell Through']], on='UPC_Barcode_SKU', how='left')
+    
+    return merged_df
+
+def apply_status_condition(df):
+    if 'shop Sell Through' not in df.columns or 'design Sell Through' not in df.columns:
+        raise ValueError("Error: 'shop Sell Through' or 'design Sell Through' column is missing.")
+        return df
+
+    df['Status'] = 'Low'
+    df.loc[df['shop Sell Through'] >= df['design Sell Through'], 'Status'] = 'High'
+    
+    return df
+
+def process_data(desired_df):#replacw with upc
+    article_days = desired_df.groupby('UPC_Barcode_SKU')['Shop Days'].max().reset_index()
+    merged_df = pd.merge(desired_df, article_days, on='UPC_Barcode_SKU', how='left', suffixes=('', '_max_days'))
+    merged_df_grouped = merged_df.groupby('UPC_Barcode_SKU').agg({
+        'OH_Qty': 'sum',
+        'Sold_Qty': 'sum',
+        'Shop Days': 'max'
+    }).reset_index()
+    result_df = merged_df_grouped[['UPC_Barcode_SKU', 'Shop Days']].rename(columns={'Shop Days': 'Date Difference'})
+    return result_df
+
+def process_and_calculate_cover(df, article_days):#replace design with upc 
+    merged_df = pd.merge(df, article_days, on='UPC_Barcode_SKU', how='left', suffixes=('', '_max_days'))
+    merged_df_grouped = merged_df.groupby('UPC_Barcode_SKU').agg({
+        'OH_Qty': 'sum',
+        'Sold_Qty': 'sum',
+        'Shop Days': 'max'
+    }).reset_index()
+    result_df = merged_df_grouped[['UPC_Barcode_SKU', 'Shop Days']].rename(columns={'Shop Days': 'Date Difference'})
+    merged_df_grouped = pd.merge(merged_df_grouped, result_df, on='UPC_Barcode_SKU', how='left')
+    merged_df_grouped['Targeted Cover'] = merged_df_grouped['OH_Qty'] / (merged_df_grouped['Sold_Qty'] / merged_df_grouped['Date Difference'])
+    return merged_df_grouped
+
+def merge_with_desired_cover(desired_df, merged_df_grouped):
+    desired_df = pd.merge(desired_df, merged_df_grouped[['UPC_Barcode_SKU', 'Targeted Cover']], on='UPC_Barcode_SKU', how='left')
+    desired_df['Targeted Cover'] = desired_df['Targeted Cover'].fillna(0).replace([np.inf, -np.inf], 0).astype(int)
+    return desired_df
+
+def calculate_article_days(df):
+    # Ensure 'Adjusted_first_Rcv_Date' exists and use the correct name
+    df['Adjusted_first_Rcv_Date'] = pd.to_datetime(df['Adjusted_first_Rcv_Date'], errors='coerce')
+    df = df.dropna(subset=['Adjusted_first_Rcv_Date'])  # Corrected column name here
+    today = pd.Timestamp.now().normalize()
+    df['Max Design Days'] = (today - df['Adjusted_first_Rcv_Date']).dt.days
+    article_days = df.groupby('UPC_Barcode_SKU')['Max Design Days'].max().reset_index()
+    return article_days
+
+
+
+def calculate_required_cover(desired_df): # desired cover * Sold_Qty / days = required on hand when we minus current o.h= transfer in/out
+    desired_df['Transfer in/out'] = desired_df['Targeted Cover'] * (desired_df['Sold_Qty'] / desired_df['Shop Days']) - desired_df['OH_Qty']
+    desired_df['Transfer in/out'] = desired_df['Transfer in/out'].replace([np.inf, -np.inf, np.nan], 0).astype(int)
+    return desired_df
+
+def merge_desired_with_article_days(desired_df, article_days):
+    desired_df = pd.merge(desired_df, article_days, on='UPC_Barcode_SKU', how='left')
+    return desired_df
+
+def filter_data(desired_df, sell_through_threshold, days_threshold):
+    filtered_df = desired_df[(desired_df['design Sell Through'] > sell_through_threshold) & (desired_df['Max Design Days'] > days_threshold)]
+    return filtered_df
+
+def process_transfer_details(filtered_df):
+    sending_stores = filtered_df[filtered_df['Transfer in/out'] < 0]
+    receiving_stores = filtered_df[filtered_df['Transfer in/out'] > 0]
+    transfer_details = []
+
+    for sending_index, sending_row in sending_stores.iterrows():
+        matches = receiving_stores[
+            (receiving_stores['UPC_Barcode_SKU'] == sending_row['UPC_Barcode_SKU']) &
+            (receiving_stores['STORE_NAME'] != sending_row['STORE_NAME']) &
+            (receiving_stores['Transfer in/out'] > 0)
+        ]
+
+        if matches.empty:
+            continue
+
+        total_qty_to_transfer = abs(sending_row['Transfer in/out'])
+
+        for receiving_index, receiving_row in matches.iterrows():
+            transfer_qty = min(total_qty_to_transfer, receiving_row['Transfer in/out'])
+            sending_stores.at[sending_index, 'Transfer in/out'] += transfer_qty
+            receiving_stores.at[receiving_index, 'Transfer in/out'] -= transfer_qty
+            transfer_details.append({
+                'UPC_Barcode_SKU': sending_row['UPC_Barcode_SKU'],
+                'From Store': sending_row['STORE_NAME'],
+                'To Store': receiving_row['STORE_NAME'],
+                'DESIGN': sending_row['DESIGN'],
+                'Size': sending_row['Size'],
+                'Color': sending_row['Color'],
+                'Volume': sending_row['Volume'],
+                'product_type': sending_row['product_type'],
+                'Size': sending_row['Size'],
+                'Quantity Transferred': transfer_qty
+            })
+            total_qty_to_transfer -= transfer_qty
+            if total_qty_to_transfer <= 0:
+                break
+
+    transfer_df = pd.DataFrame(transfer_details)
+    return transfer_df
+
+
+def run(data, threshold_date, sell_through_threshold, days_threshold):
+    """The sequence of calls ``show_Network`` made."""
+    adjusted_data = adjust_date(data, threshold_date)
+    aggregated_data = aggregate_data(adjusted_data, threshold_date)
+    sell_through_data = calculate_sell_through(aggregated_data)
+    days_data = calculate_days(sell_through_data)
+    design_sell_through_data = calculate_design_sell_through(days_data)
+    merged_data = merge_data(days_data, design_sell_through_data)
+    status_data = apply_status_condition(merged_data)
+    processed_data = process_data(status_data)
+    cover_data = process_and_calculate_cover(status_data, processed_data)
+    cover_merged_data = merge_with_desired_cover(status_data, cover_data)
+    article_days = calculate_article_days(cover_merged_data)
+    required_cover_data = calculate_required_cover(cover_merged_data)
+    final_data = merge_desired_with_article_days(required_cover_data, article_days)
+    filtered_data = filter_data(final_data, sell_through_threshold, days_threshold)
+    return filtered_data, process_transfer_details(filtered_data)
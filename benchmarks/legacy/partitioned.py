@@ -0,0 +1,222 @@
+"""
+The City / Regional page pipeline as it stood before transfer_engine.py, the
+parity reference for benchmarks/bench_transfer_engine.py and
+tests/test_transfer_engine_parity.py.
+
+The two pages were identical apart from the partition column, which is
+``PARTITION`` here; they used the display column names in ``DISPLAY_NAMES``.
+The stage functions are the pages' code with these changes only:
+
+- every ``groupby`` passes ``observed=True``, so categorical key columns
+  (the loader's compact schema) group like the object columns the pages
+  were written for, instead of producing every combination of categories;
+- the hard-coded ``'City'`` key is ``PARTITION``;
+- ``run`` is new: the call sequence from the page, on loader column names.
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+PARTITION = "City"
+
+# Loader column name -> the name these stages expect
+DISPLAY_NAMES = {
+    "UPC_Barcode_SKU": "UPC/Barcode/SKU",
+    "first_rcv_date": "1st Rcv Date",
+    "Adjusted_first_Rcv_Date": "Adjusted 1st Rcv Date",
+    "Shop_Rcv_Qty": "Shop Rcv Qty",
+    "Disp_Qty": "Disp. Qty",
+    "OH_Qty": "O.H Qty",
+    "Sold_Qty": "Sold Qty",
+}
+
+
+def adjust_date(df, threshold_date):
+    def adjust_single_date(date):
+        threshold_timestamp = pd.Timestamp(threshold_date)
+        if date <= threshold_timestamp:
+            return threshold_timestamp
+        else:
+            return date
+    df['1st Rcv Date'] = pd.to_datetime(df['1st Rcv Date'])
+    df['Adjusted 1st Rcv Date'] = df['1st Rcv Date'].apply(adjust_single_date)
+    return df
+
+def aggregate_data(df, threshold_date):
+    df = adjust_date(df, threshold_date)
+    return df.groupby([PARTITION, 'UPC/Barcode/SKU', 'STORE_NAME', 'DESIGN',
+                       'Adjusted 1st Rcv Date', 'Volume', 'product_type', 'Size', 'Color'], observed=True).agg({
+        'Shop Rcv Qty': 'sum',
+        'Disp. Qty': 'sum',
+        'O.H Qty': 'sum',
+        'Sold Qty': 'sum'
+    }).reset_index()
+
+def calculate_sell_through(desired_df):
+    sell_through = (desired_df['Sold Qty'] /
+                    (desired_df['Shop Rcv Qty'] - desired_df['Disp. Qty']) * 100)
+    sell_through = sell_through.replace([np.inf, -np.inf, np.nan], 0)
+    desired_df['shop Sell Through'] = sell_through.astype(int)
+    return desired_df
+
+def calculate_days(df):
+    current_date = datetime.now()
+    df['Shop Days'] = (current_date - df['Adjusted 1st Rcv Date']).dt.days
+    return df
+
+def calculate_design_sell_through(df):
+    df['Net Receiving'] = df['Shop Rcv Qty'] - df['Disp. Qty']
+    design_totals = df.groupby(['UPC/Barcode/SKU', PARTITION], observed=True).agg(
+        {'Sold Qty': 'sum', 'Net Receiving': 'sum'}).reset_index()
+    design_totals['design Sell Through'] = (
+        design_totals['Sold Qty'] / design_totals['Net Receiving'] * 100)
+    design_totals['design Sell Through'] = design_totals['design Sell Through'].replace(
+        [np.inf, -np.inf, np.nan], 0).astype(int)
+    return design_totals
+
+def merge_data(desired_df, design_totals):
+    return pd.merge(desired_df,
+                    design_totals[['UPC/Barcode/SKU', PARTITION, 'design Sell Through']],
+                    on=['UPC/Barcode/SKU', PARTITION],
+                    how='left')
+
+def apply_status_condition(desired_df):
+    desired_df['Status'] = 'Low'
+    desired_df.loc[desired_df['shop Sell Through'] > desired_df['design Sell Through'], 'Status'] = 'High'
+    return desired_df
+
+def process_data(desired_df):
+    article_days = desired_df.groupby(['UPC/Barcode/SKU', PARTITION], observed=True)['Shop Days'].max().reset_index()
+    merged_df = pd.merge(desired_df, article_days,
+                         on=['UPC/Barcode/SKU', PARTITION],
+                         how='left',
+                         suffixes=('', '_max_days'))
+    merged_df_grouped = merged_df.groupby(['UPC/Barcode/SKU', PARTITION], observed=True).agg({
+        'O.H Qty': 'sum',
+        'Sold Qty': 'sum',
+        'Shop Days': 'max'
+    }).reset_index()
+    result_df = merged_df_grouped[['UPC/Barcode/SKU', PARTITION, 'Shop Days']].rename(
+        columns={'Shop Days': 'Date Difference'})
+    return result_df
+
+def process_and_calculate_cover(df, article_days):
+    merged_df = pd.merge(df, article_days,
+                         on=['UPC/Barcode/SKU', PARTITION],
+                         how='left',
+                         suffixes=('', '_max_days'))
+    merged_df_grouped = merged_df.groupby(['UPC/Barcode/SKU', PARTITION], observed=True).agg({
+        'O.H Qty': 'sum',
+        'Sold Qty': 'sum',
+        'Shop Days': 'max'
+    }).reset_index()
+    result_df = merged_df_grouped[['UPC/Barcode/SKU', PARTITION, 'Shop Days']].rename(
+        columns={'Shop Days': 'Date Difference'})
+    merged_df_grouped = pd.merge(merged_df_grouped, result_df,
+                                 on=['UPC/Barcode/SKU', PARTITION],
+                                 how='left')
+    merged_df_grouped['Targeted Cover'] = merged_df_grouped['O.H Qty'] / (
+        merged_df_grouped['Sold Qty'] / merged_df_grouped['Date Difference'])
+    return merged_df_grouped
+
+def merge_with_desired_cover(desired_df, merged_df_grouped):
+    desired_df = pd.merge(desired_df,
+                          merged_df_grouped[['UPC/Barcode/SKU', PARTITION, 'Targeted Cover']],
+                          on=['UPC/Barcode/SKU', PARTITION],
+                          how='left')
+    desired_df['Targeted Cover'] = desired_df['Targeted Cover'].fillna(0).replace(
+        [np.inf, -np.inf], 0).astype(int)
+    return desired_df
+
+def calculate_article_days(df):
+    df['Adjusted 1st Rcv Date'] = pd.to_datetime(df['Adjusted 1st Rcv Date'], errors='coerce')
+    df = df.dropna(subset=['Adjusted 1st Rcv Date'])
+    today = pd.Timestamp.now().normalize()
+    df['Max Design Days'] = (today - df['Adjusted 1st Rcv Date']).dt.days
+    article_days = df.groupby(['UPC/Barcode/SKU', PARTITION], observed=True)['Max Design Days'].max().reset_index()
+    return article_days
+
+def calculate_required_cover(desired_df):
+    desired_df['Transfer in/out'] = desired_df['Targeted Cover'] * (
+        desired_df['Sold Qty'] / desired_df['Shop Days']) - desired_df['O.H Qty']
+    desired_df['Transfer in/out'] = desired_df['Transfer in/out'].replace(
+        [np.inf, -np.inf, np.nan], 0).astype(int)
+    return desired_df
+
+def merge_desired_with_article_days(desired_df, article_days):
+    desired_df = pd.merge(desired_df, article_days,
+                          on=['UPC/Barcode/SKU', PARTITION],
+                          how='left')
+    return desired_df
+
+def filter_data(desired_df, sell_through_threshold, days_threshold):
+    filtered_df = desired_df[
+        (desired_df['design Sell Through'] > sell_through_threshold) &
+        (desired_df['Max Design Days'] > days_threshold)
+    ]
+    return filtered_df
+
+def process_transfer_details(filtered_df):
+    sending_stores = filtered_df[filtered_df['Transfer in/out'] < 0]
+    receiving_stores = filtered_df[filtered_df['Transfer in/out'] > 0]
+    transfer_details = []
+
+    for sending_index, sending_row in sending_stores.iterrows():
+        matches = receiving_stores[
+            (receiving_stores[PARTITION] == sending_row[PARTITION]) &  # Ensure same partition
+            (receiving_stores['UPC/Barcode/SKU'] == sending_row['UPC/Barcode/SKU']) &
+            (receiving_stores['STORE_NAME'] != sending_row['STORE_NAME']) &
+            (receiving_stores['Transfer in/out'] > 0)
+        ]
+
+        if matches.empty:
+            continue
+
+        total_qty_to_transfer = abs(sending_row['Transfer in/out'])
+
+        for receiving_index, receiving_row in matches.iterrows():
+            transfer_qty = min(total_qty_to_transfer, receiving_row['Transfer in/out'])
+            sending_stores.at[sending_index, 'Transfer in/out'] += transfer_qty
+            receiving_stores.at[receiving_index, 'Transfer in/out'] -= transfer_qty
+            transfer_details.append({
+                PARTITION: sending_row[PARTITION],
+                'UPC/Barcode/SKU': sending_row['UPC/Barcode/SKU'],
+                'From Store': sending_row['STORE_NAME'],
+                'To Store': receiving_row['STORE_NAME'],
+                'DESIGN': sending_row['DESIGN'],
+                'Size': sending_row['Size'],
+                'Color': sending_row['Color'],
+                'Volume': sending_row['Volume'],
+                'product_type': sending_row['product_type'],
+                'Quantity Transferred': transfer_qty
+            })
+            total_qty_to_transfer -= transfer_qty
+            if total_qty_to_transfer <= 0:
+                break
+
+    return pd.DataFrame(transfer_details)
+
+
+def run(data, threshold_date, sell_through_threshold, days_threshold):
+    """
+    The sequence of calls ``show_city`` / ``show_regional`` made, on loader
+    column names (renamed to ``DISPLAY_NAMES`` on the way in and back out).
+    """
+    back = {v: k for k, v in DISPLAY_NAMES.items()}
+    data = data.rename(columns=DISPLAY_NAMES)
+    adjusted_data = adjust_date(data, threshold_date)
+    aggregated_data = aggregate_data(adjusted_data, threshold_date)
+    sell_through_data = calculate_sell_through(aggregated_data)
+    days_data = calculate_days(sell_through_data)
+    design_sell_through_data = calculate_design_sell_through(days_data)
+    merged_data = merge_data(days_data, design_sell_through_data)
+    status_data = apply_status_condition(merged_data)
+    processed_data = process_data(status_data)
+    cover_data = process_and_calculate_cover(status_data, processed_data)
+    cover_merged_data = merge_with_desired_cover(status_data, cover_data)
+    article_days = calculate_article_days(cover_merged_data)
+    required_cover_data = calculate_required_cover(cover_merged_data)
+    final_data = merge_desired_with_article_days(required_cover_data, article_days)
+    filtered_data = filter_data(final_data, sell_through_threshold, days_threshold)
+    transfer_details = process_transfer_details(filtered_data)
+    return filtered_data.rename(columns=back), transfer_details.rename(columns=back)
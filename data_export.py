@@ -0,0 +1,190 @@
+# data_export.py — streaming CSV, Parquet, zip-bundle and per-store downloads of the result frames
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from excel_export import SPOOL_MAX_BYTES
+from store_api import PARQUET
+
+CSV_GZ_MIME = "application/gzip"
+ZIP_MIME = "application/zip"
+
+BATCH_ROWS = 100_000
+GZIP_LEVEL = 6
+
+
+def write_csv(df: pd.DataFrame, fileobj, batch_rows: int = BATCH_ROWS):
+    """
+    ``df`` as UTF-8 CSV into the binary ``fileobj``, ``batch_rows`` rows
+    at a time, so only one batch's text exists at once. The header is
+    written even for an empty frame. ``fileobj`` is left open.
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+    try:
+        for start in range(0, max(len(df), 1), batch_rows):
+            df.iloc[start:start + batch_rows].to_csv(text, index=False, header=start == 0)
+        text.flush()
+    finally:
+        text.detach()
+
+
+def write_csv_gz(df: pd.DataFrame, fileobj, batch_rows: int = BATCH_ROWS):
+    with gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=GZIP_LEVEL) as gz:
+        write_csv(df, gz, batch_rows)
+
+
+def write_parquet(df: pd.DataFrame, fileobj, batch_rows: int = BATCH_ROWS):
+    """``df`` as zstd Parquet, one row group per batch; categoricals stay dictionary-encoded."""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(fileobj, schema, compression="zstd") as writer:
+        for start in range(0, len(df), batch_rows):
+            batch = df.iloc[start:start + batch_rows]
+            writer.write_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+
+
+FORMATS = {
+    "csv.gz": (CSV_GZ_MIME, write_csv_gz),
+    "parquet": (PARQUET, write_parquet),
+}
+
+
+def export_file(df: pd.DataFrame, fmt: str, batch_rows: int = BATCH_ROWS, spool_bytes: int = SPOOL_MAX_BYTES):
+    """
+    ``df`` in one of ``FORMATS`` in a ``SpooledTemporaryFile``, rewound:
+    it stays in memory up to ``spool_bytes`` and moves to disk beyond that.
+    The caller closes it.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {list(FORMATS)}, not {fmt!r}")
+    output = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    try:
+        FORMATS[fmt][1](df, output, batch_rows)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+def export_bytes(df: pd.DataFrame, fmt: str, batch_rows: int = BATCH_ROWS) -> bytes:
+    """``df`` in one of ``FORMATS`` as bytes, for ``st.download_button``."""
+    with export_file(df, fmt, batch_rows) as f:
+        return f.read()
+
+
+def write_bundle(frames: dict, parameters: dict, fileobj, batch_rows: int = BATCH_ROWS):
+    """
+    A zip of ``{name: frame}`` as ``<name>.csv`` plus ``manifest.json``
+    (``parameters``, the write time and each file's rows and columns).
+    The CSVs are streamed into the zip, deflated as they are written.
+    """
+    files = []
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=GZIP_LEVEL) as bundle:
+        for name, df in frames.items():
+            with bundle.open(f"{name}.csv", "w", force_zip64=True) as member:
+                write_csv(df, member, batch_rows)
+            files.append({"name": f"{name}.csv", "rows": len(df), "columns": [str(c) for c in df.columns]})
+        manifest = {"generated_at": datetime.now().isoformat(timespec="seconds"), "parameters": parameters,
+                    "files": files}
+        bundle.writestr("manifest.json", json.dumps(manifest, indent=2, default=str))
+
+
+def bundle_bytes(frames: dict, parameters: dict, batch_rows: int = BATCH_ROWS) -> bytes:
+    """``write_bundle`` through a spooled temp file, as bytes."""
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as output:
+        write_bundle(frames, parameters, output, batch_rows)
+        output.seek(0)
+        return output.read()
+
+
+# ---------- STORE SLIPS ----------
+SLIP_WORKERS = int(os.getenv("EXPORT_WORKERS", min(8, os.cpu_count() or 1)))
+SLIP_ZIP_LEVEL = 1
+
+
+def slip_name(by, key) -> str:
+    """File name of one slip: ``Store006.csv``, or ``Store006 to Store029.csv`` by From and To Store."""
+    key = key if isinstance(key, tuple) else (key,)
+    name = " to ".join(str(k) for k in key) if tuple(by) == ("From Store", "To Store") else " ".join(map(str, key))
+    return re.sub(r"[^\w. -]+", "_", name).strip() + ".csv"
+
+
+def slip_names(by, keys) -> list:
+    """
+    ``slip_name`` of each key, made unique: store names that clean up to
+    the same file name (``A/B`` and ``A:B`` are both ``A_B.csv``, and zip
+    tools on Windows ignore case) get `` (2)``, `` (3)``, ... in key order.
+    """
+    names, used = [], set()
+    for key in keys:
+        name = slip_name(by, key)
+        stem, n = name[:-len(".csv")], 1
+        while name.casefold() in used:
+            n += 1
+            name = f"{stem} ({n}).csv"
+        used.add(name.casefold())
+        names.append(name)
+    return names
+
+
+def _slip_table(transfers: pd.DataFrame, groups: dict) -> pa.Table:
+    """``transfers`` as Arrow, rows grouped slip by slip and categories spelled out, so each slip is a slice."""
+    rows = np.concatenate(list(groups.values())) if groups else np.arange(0)
+    table = pa.Table.from_pandas(transfers, preserve_index=False).take(rows)
+    return pa.table({name: column.cast(column.type.value_type) if pa.types.is_dictionary(column.type) else column
+                     for name, column in zip(table.column_names, table.columns)})
+
+
+def _slip_csv(table: pa.Table) -> bytes:
+    # Arrow's CSV writer runs without the GIL, so slips are formatted in parallel on the worker threads
+    sink = pa.BufferOutputStream()
+    pa_csv.write_csv(table, sink, pa_csv.WriteOptions(quoting_style="needed"))
+    return sink.getvalue().to_pybytes()
+
+
+def write_store_slips(transfers: pd.DataFrame, fileobj, by=("From Store",), workers: int = SLIP_WORKERS) -> int:
+    """
+    A zip of one CSV pick list per store: ``transfers`` split by ``by``
+    (``From Store``, optionally with ``To Store``), rows in their original
+    order. ``workers`` threads format the slips; the calling thread adds
+    each to the zip as it is done, in store order, deflating it while the
+    threads carry on. At most ``2 * workers`` finished slips wait in
+    memory. Returns the number of slips.
+    """
+    by = list(by)
+    groups = transfers.groupby(by, observed=True, sort=True).indices
+    table = _slip_table(transfers, groups)
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=SLIP_ZIP_LEVEL) as bundle, \
+            ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        pending = deque()
+        start = 0
+        for name, rows in zip(slip_names(by, groups), groups.values()):
+            pending.append((name, executor.submit(_slip_csv, table.slice(start, len(rows)))))
+            start += len(rows)
+            if len(pending) >= 2 * workers:
+                name, future = pending.popleft()
+                bundle.writestr(name, future.result())
+        for name, future in pending:
+            bundle.writestr(name, future.result())
+    return len(groups)
+
+
+def store_slips_bytes(transfers: pd.DataFrame, by=("From Store",), workers: int = SLIP_WORKERS) -> bytes:
+    """``write_store_slips`` through a spooled temp file, as bytes."""
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as output:
+        write_store_slips(transfers, output, by, workers)
+        output.seek(0)
+        return output.read()
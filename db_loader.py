@@ -0,0 +1,310 @@
+# db_loader.py — optional direct SQL loader for dbo.Product_Data (skips the Flask/ngrok hop)
+#
+# Same payload and result as store_api.load_store_data, read straight from the
+# database the way test.py connects. The API scopes data by user_id; this path
+# does not, so only enable it (data_source = "db") for trusted deployments.
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from store_api import (
+    aggregate_keys,
+    combine_aggregated,
+    compact_store_frame,
+    concat_store_frames,
+    empty_store_frame,
+    frame_memory,
+    normalize_store_frame,
+)
+
+TABLE = "dbo.Product_Data"
+FILTER_COLUMNS = ["Volume", "product_type", "Season", "City", "Zone", "Years"]
+
+# Same grain as local_api.GRAIN_COLUMNS: rows with a null here never reach filter_data
+GRAIN_COLUMNS = ["UPC_Barcode_SKU", "STORE_NAME", "DESIGN", "first_rcv_date", "Volume", "product_type", "Size", "Color"]
+
+# Rows per fetchmany() round-trip
+DEFAULT_ARRAYSIZE = 50_000
+
+# ODBC driver when secrets.json does not name one
+DEFAULT_DRIVER = "ODBC Driver 18 for SQL Server"
+
+
+# ---------- CONNECTIONS ----------
+def mssql_connection_string(cfg: dict) -> str:
+    """ODBC connection string for secrets.json's ``mssql`` block; ``driver`` and ``port`` are optional."""
+    server = f"{cfg['server']},{cfg['port']}" if cfg.get("port") else cfg["server"]
+    return (
+        f"DRIVER={{{cfg.get('driver', DEFAULT_DRIVER)}}};"
+        f"SERVER={server};"
+        f"DATABASE={cfg['database']};"
+        f"UID={cfg['username']};"
+        f"PWD={cfg['password']};"
+        f"Encrypt=yes;TrustServerCertificate=yes;"
+    )
+
+
+def connect_mssql(secrets_path: str = "secrets.json"):
+    import pyodbc
+
+    with open(os.path.join(os.getcwd(), secrets_path), "r") as f:
+        cfg = json.load(f)["mssql"]
+    return pyodbc.connect(mssql_connection_string(cfg))
+
+
+def connect_sqlite(path: str):
+    """
+    Open a SQLite file as a stand-in for the SQL Server database.
+
+    The file is attached as schema ``dbo`` so ``dbo.Product_Data`` resolves
+    and the same queries run unchanged.
+    """
+    sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute("ATTACH DATABASE ? AS dbo", (path,))
+    return conn
+
+
+def write_sqlite_stand_in(path: str, df: pd.DataFrame):
+    """Write ``df`` as table ``Product_Data`` in a SQLite file usable with ``connect_sqlite``."""
+    with sqlite3.connect(path) as conn:
+        df.to_sql("Product_Data", conn, index=False, if_exists="replace", chunksize=50_000)
+
+
+class ConnectionPool:
+    """
+    Keeps up to ``size`` idle connections open between Streamlit reruns.
+
+    A connection that raised while checked out, or was left mid-read (a
+    generator over its rows closed early: ``GeneratorExit``, or
+    ``KeyboardInterrupt``), is closed instead of being returned, so a
+    broken or busy link is never handed out again.
+    """
+
+    def __init__(self, connect, size: int = 4):
+        self._connect = connect
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+
+        try:
+            yield conn
+        except BaseException:
+            conn.close()
+            raise
+
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool; STORE_DB_SQLITE points it at a SQLite stand-in."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                sqlite_path = os.getenv("STORE_DB_SQLITE", "").strip()
+                connect = (lambda: connect_sqlite(sqlite_path)) if sqlite_path else connect_mssql
+                _pool = ConnectionPool(connect, size=int(os.getenv("STORE_DB_POOL_SIZE", "4")))
+    return _pool
+
+
+# ---------- QUERIES ----------
+def _filter_clause(payload: dict, alias: str = "") -> tuple:
+    """WHERE conditions and parameters for the payload's filters, always parameterized."""
+    conditions, params = [], []
+    for col in FILTER_COLUMNS:
+        value = payload.get(col)
+        values = value if isinstance(value, (list, tuple)) else [value]
+        values = [v for v in values if v not in (None, "", "All")]
+        if values:
+            conditions.append(f"{alias}{col} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    return conditions, params
+
+
+def _where(conditions: list) -> str:
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def build_query(payload: dict, table: str = TABLE) -> tuple:
+    """
+    Return ``(sql, params)`` selecting the rows ``/store_data`` would serve.
+
+    A ``prefilter`` block (see ``store_api.make_prefilter``) becomes a
+    grouped subquery that keeps only SKUs whose sell-through and age pass,
+    computed with the same float arithmetic as the pipeline. An
+    ``aggregate`` block wraps the result in ``build_aggregate_query``.
+    """
+    sql, params = _build_row_query(payload, table)
+    aggregate = payload.get("aggregate")
+    if aggregate:
+        return build_aggregate_query(sql, params, aggregate)
+    return sql, params
+
+
+def build_aggregate_query(row_sql: str, params: list, aggregate: dict) -> tuple:
+    """
+    Aggregate a row query to ``aggregate_data``'s grain inside the database.
+
+    The launch-date clamp is computed in a derived table first so that SQL
+    Server can group by it without repeating the parameterized CASE.
+    """
+    keys = aggregate_keys(aggregate.get("partition"))
+    threshold = datetime.fromisoformat(aggregate["threshold_date"])
+    not_null = [f"{col} IS NOT NULL" for col in keys]
+    sums = ", ".join(f"COALESCE(SUM({c}), 0) AS {c}" for c in ["Shop_Rcv_Qty", "Disp_Qty", "OH_Qty", "Sold_Qty"])
+    key_list = ", ".join(keys)
+    sql = (
+        f"SELECT {key_list}, {sums} FROM ("
+        f"SELECT r.*, CASE WHEN r.first_rcv_date <= ? THEN ? ELSE r.first_rcv_date END AS Adjusted_first_Rcv_Date"
+        f" FROM ({row_sql}) r"
+        f") a{_where(not_null)} GROUP BY {key_list}"
+    )
+    return sql, [threshold, threshold] + params
+
+
+def _build_row_query(payload: dict, table: str) -> tuple:
+    conditions, params = _filter_clause(payload)
+    prefilter = payload.get("prefilter")
+    if not prefilter:
+        return f"SELECT * FROM {table}{_where(conditions)}", params
+
+    partition = prefilter.get("partition")
+    keys = ["UPC_Barcode_SKU"] + ([partition] if partition else [])
+
+    # (as_of - max(first_rcv, threshold)).days > min_age  <=>  both dates <= cutoff
+    as_of = datetime.fromisoformat(prefilter["as_of"])
+    cutoff = as_of - timedelta(days=int(prefilter["min_age_days"]) + 1)
+    if datetime.fromisoformat(prefilter["threshold_date"]) > cutoff:
+        return f"SELECT * FROM {table} WHERE 1 = 0", []
+
+    not_null = [f"{col} IS NOT NULL" for col in dict.fromkeys(GRAIN_COLUMNS + keys)]
+    sell_through = (
+        "COALESCE(CAST(COALESCE(SUM(Sold_Qty), 0) AS FLOAT)"
+        " / NULLIF(COALESCE(SUM(Shop_Rcv_Qty), 0) - COALESCE(SUM(Disp_Qty), 0), 0) * 100, 0)"
+    )
+    key_list = ", ".join(keys)
+    passing = (
+        f"SELECT {key_list} FROM {table}{_where(conditions + not_null)}"
+        f" GROUP BY {key_list}"
+        f" HAVING CAST({sell_through} AS INT) > ? AND MIN(first_rcv_date) <= ?"
+    )
+    join_on = " AND ".join(f"p.{k} = s.{k}" for k in keys)
+    outer_conditions, outer_params = _filter_clause(payload, alias="p.")
+    sql = (
+        f"SELECT p.* FROM {table} p JOIN ({passing}) s ON {join_on}"
+        f"{_where(outer_conditions)}"
+    )
+    return sql, params + [prefilter["sell_through_threshold"], cutoff] + outer_params
+
+
+def fetch_columnar(cursor, arraysize: int = DEFAULT_ARRAYSIZE):
+    """
+    Yield one DataFrame per ``fetchmany`` batch, built column by column.
+
+    Each batch of row tuples is transposed once into per-column NumPy arrays
+    and released, instead of growing a list of rows for the whole result.
+    """
+    cursor.arraysize = arraysize
+    names = [d[0] for d in cursor.description]
+    while True:
+        rows = cursor.fetchmany(arraysize)
+        if not rows:
+            break
+        columns = zip(*rows)
+        del rows
+        yield pd.DataFrame({name: np.array(values, dtype=object) for name, values in zip(names, columns)})
+
+
+def iter_store_data_db(payload: dict, pool: ConnectionPool | None = None, arraysize: int = DEFAULT_ARRAYSIZE,
+                       on_page=None, compact: bool = True, stats: dict | None = None, table: str = TABLE):
+    """
+    Yield the normalized (and compacted) result of ``build_query`` one ``fetchmany`` batch at a time.
+
+    Counterpart of ``store_api.iter_store_data``: the pooled connection is
+    held until the generator is exhausted or closed.
+    """
+    sql, params = build_query(payload, table)
+    rows_loaded = 0
+    with (pool or get_pool()).connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            for chunk in fetch_columnar(cursor, arraysize):
+                # Driver values arrive as objects; infer text/int dtypes, then the usual rules
+                chunk = normalize_store_frame(chunk.infer_objects())
+                if compact:
+                    chunk = compact_store_frame(chunk, stats)
+                rows_loaded += len(chunk)
+                if on_page is not None:
+                    on_page(rows_loaded, None)
+                yield chunk
+        finally:
+            cursor.close()
+
+
+def load_store_data_db(payload: dict, pool: ConnectionPool | None = None, arraysize: int = DEFAULT_ARRAYSIZE,
+                       on_page=None, cache=None, refresh: bool = False, compact: bool = True,
+                       stats: dict | None = None, table: str = TABLE) -> pd.DataFrame:
+    """
+    Drop-in for ``store_api.load_store_data`` that queries the database directly.
+
+    Accepts the same payload (filters and optional ``prefilter``) and returns
+    the same normalized, compacted frame. Results share the on-disk cache
+    under their own endpoint key.
+    """
+    cache_key = None
+    if cache is not None:
+        filters = {k: v for k, v in payload.items() if k != "user_id"}
+        cache_key = cache.make_key(payload.get("user_id"), f"db:{table}", filters)
+        if not refresh:
+            df = cache.get(cache_key)
+            if df is not None:
+                if stats is not None:
+                    stats["after_bytes"] = frame_memory(df)
+                if on_page is not None:
+                    on_page(len(df), len(df))
+                return df
+
+    chunks = list(iter_store_data_db(payload, pool, arraysize, on_page=on_page, compact=compact, stats=stats,
+                                     table=table))
+    if not chunks:
+        return empty_store_frame(payload, compact)
+    df = concat_store_frames(chunks)
+
+    aggregate = payload.get("aggregate")
+    if aggregate:
+        df = combine_aggregated(df, aggregate.get("partition"))
+
+    if stats is not None and compact:
+        stats["after_bytes"] = frame_memory(df)
+    if cache_key is not None:
+        cache.put(cache_key, df)
+    return df
@@ -0,0 +1,129 @@
+# excel_export.py — streaming .xlsx export of the processed and transfer sheets
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+BATCH_ROWS = 20_000
+MAX_SHEET_ROWS = 1_048_575  # Excel's row limit, less the header
+SPOOL_MAX_BYTES = 64 * 1024 ** 2
+
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+DAY = pd.Timedelta(days=1)
+
+FORMATS = {
+    "int": {"num_format": "0"},
+    "float": {"num_format": "0.00"},
+    "date": {"num_format": "yyyy-mm-dd"},
+    "datetime": {"num_format": "yyyy-mm-dd hh:mm:ss"},
+    "bool": {},
+    "text": {},
+}
+WORKBOOK_OPTIONS = {
+    "constant_memory": True,
+    "strings_to_formulas": False,
+    "strings_to_urls": False,
+    "strings_to_numbers": False,
+    "default_date_format": "yyyy-mm-dd",
+}
+
+
+def column_kind(col: pd.Series) -> str:
+    """The cell format a column is written with: int, float, date, datetime, bool or text."""
+    dtype = col.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return column_kind(pd.Series(dtype.categories)) if len(dtype.categories) else "text"
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "int"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        times = col.dropna()
+        if getattr(dtype, "tz", None) is not None:
+            times = times.dt.tz_localize(None)
+        return "date" if (times == times.dt.normalize()).all() else "datetime"
+    return "text"
+
+
+def _cells(col: pd.Series, kind: str) -> list:
+    """One batch of a column as Python values for xlsxwriter; missing values become None (an empty cell)."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        col = col.astype(object)
+    if kind in ("date", "datetime"):
+        col = pd.to_datetime(col)
+        if col.dt.tz is not None:
+            col = col.dt.tz_localize(None)
+        col = (col - EXCEL_EPOCH) / DAY
+    missing = col.isna().to_numpy()
+    values = col.to_numpy(dtype=object, copy=True)
+    if missing.any():
+        values[missing] = None
+    if kind == "float":
+        # Excel has no infinity; written as text, like pandas' inf_rep
+        infinite = np.isinf(col.to_numpy(dtype=float, na_value=np.nan))
+        if infinite.any():
+            values[infinite] = np.where(col.to_numpy(dtype=float, na_value=np.nan)[infinite] > 0, "inf", "-inf")
+    return values.tolist()
+
+
+def write_sheet(workbook, df: pd.DataFrame, sheet_name: str, batch_rows: int = BATCH_ROWS) -> list:
+    """
+    Write ``df`` in row order to new worksheets of a constant-memory
+    workbook, ``batch_rows`` rows at a time, so only one batch of cell
+    values exists at once. Frames longer than Excel's row limit carry on
+    in ``"<name> (2)"`` and so on. Returns the worksheet names.
+    """
+    header = workbook.add_format({"bold": True, "border": 1})
+    kinds = [column_kind(df[c]) for c in df.columns]
+    formats = {kind: workbook.add_format(FORMATS[kind]) for kind in set(kinds)}
+    widths = [max(len(str(c)) + 2, 10) for c in df.columns]
+
+    names = []
+    for part, start in enumerate(range(0, max(len(df), 1), MAX_SHEET_ROWS)):
+        suffix = f" ({part + 1})" if part else ""
+        worksheet = workbook.add_worksheet(sheet_name[:31 - len(suffix)] + suffix)
+        names.append(worksheet.name)
+        for i, kind in enumerate(kinds):
+            worksheet.set_column(i, i, widths[i], formats[kind])
+        worksheet.write_row(0, 0, [str(c) for c in df.columns], header)
+        worksheet.freeze_panes(1, 0)
+
+        row = 1
+        stop = min(start + MAX_SHEET_ROWS, len(df))
+        for lo in range(start, stop, batch_rows):
+            batch = df.iloc[lo:min(lo + batch_rows, stop)]
+            columns = [_cells(batch.iloc[:, i], kind) for i, kind in enumerate(kinds)]
+            for values in zip(*columns):
+                worksheet.write_row(row, 0, values)
+                row += 1
+    return names
+
+
+def excel_file(sheets: dict, batch_rows: int = BATCH_ROWS, spool_bytes: int = SPOOL_MAX_BYTES):
+    """
+    ``{sheet name: frame}`` as an .xlsx in a ``SpooledTemporaryFile``,
+    rewound: it stays in memory up to ``spool_bytes`` and moves to disk
+    beyond that. The caller closes it.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    try:
+        workbook = xlsxwriter.Workbook(output, WORKBOOK_OPTIONS)
+        for name, df in sheets.items():
+            write_sheet(workbook, df, name, batch_rows)
+        workbook.close()
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+def to_excel_bytes(df: pd.DataFrame, sheet_name: str = "Sheet1", batch_rows: int = BATCH_ROWS) -> bytes:
+    """One frame as .xlsx bytes, for ``st.download_button``."""
+    with excel_file({sheet_name: df}, batch_rows) as f:
+        return f.read()
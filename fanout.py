@@ -0,0 +1,67 @@
+# fanout.py — run independent API calls concurrently on a bounded thread pool
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class FanOutResult:
+    """Results of the calls that finished, and the error for each one that did not."""
+
+    def __init__(self, results: dict, errors: dict):
+        self.results = results
+        self.errors = errors
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def describe_errors(self) -> str:
+        return "; ".join(f"{key}: {err}" for key, err in self.errors.items())
+
+
+def fan_out(calls: dict, max_workers: int = DEFAULT_MAX_WORKERS, deadline: float | None = None,
+            on_result=None) -> FanOutResult:
+    """
+    Run ``{key: zero-arg callable}`` in parallel and collect what comes back.
+
+    At most ``max_workers`` calls run at once. Calls still running when
+    ``deadline`` seconds have passed are abandoned and reported as
+    ``TimeoutError``; calls that raise are reported with their exception.
+    ``on_result(key, value)`` runs in the caller's thread as each call
+    succeeds, so it may safely update Streamlit elements.
+    """
+    results, errors = {}, {}
+    if not calls:
+        return FanOutResult(results, errors)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calls))))
+    try:
+        futures = {executor.submit(fn): key for key, fn in calls.items()}
+        pending = set(futures)
+        stop_at = None if deadline is None else time.monotonic() + deadline
+
+        while pending:
+            timeout = None if stop_at is None else max(0.0, stop_at - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                key = futures[future]
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    errors[key] = e
+                else:
+                    if on_result is not None:
+                        on_result(key, results[key])
+
+        for future in pending:
+            future.cancel()
+            errors[futures[future]] = TimeoutError(f"no reply within {deadline}s")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # Keep the caller's key order
+    ordered = {key: results[key] for key in calls if key in results}
+    return FanOutResult(ordered, {key: errors[key] for key in calls if key in errors})
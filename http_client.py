@@ -0,0 +1,107 @@
+# http_client.py — process-wide pooled HTTP client for the Flask API
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ---------- CONFIG ----------
+DEFAULT_TIMEOUT = 10
+
+# Per-endpoint timeouts in seconds (connect, read); anything else uses DEFAULT_TIMEOUT.
+ENDPOINT_TIMEOUTS = {
+    "/store_data": (5, 60),
+    "/unique_values": (5, 15),
+}
+
+# Endpoints that only read, so repeating them after a 5xx or dropped
+# connection is safe. Writes are only retried when the connection was never made.
+IDEMPOTENT_ENDPOINTS = {"/get_user", "/store_data", "/unique_values"}
+
+RETRY_STATUSES = {502, 503, 504}
+
+
+class ApiClient:
+    """
+    One keep-alive ``requests.Session`` shared by every API call.
+
+    Reusing pooled connections avoids a fresh TCP+TLS handshake through the
+    ngrok tunnel on every Streamlit rerun. Failed reads are retried up to
+    ``max_retries`` times with exponential backoff.
+    """
+
+    def __init__(self, pool_size: int = 10, max_retries: int = 2, backoff: float = 0.5,
+                 max_backoff: float = 8.0, timeouts: dict | None = None):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeouts = dict(ENDPOINT_TIMEOUTS, **(timeouts or {}))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @staticmethod
+    def _endpoint(url: str) -> str:
+        path = urlsplit(url).path.rstrip("/")
+        return "/" + path.rsplit("/", 1)[-1]
+
+    def timeout_for(self, url: str):
+        return self.timeouts.get(self._endpoint(url), DEFAULT_TIMEOUT)
+
+    def post(self, url: str, json: dict | None = None, timeout=None, **kwargs) -> requests.Response:
+        """POST with the pooled session, per-endpoint timeout and bounded retry."""
+        endpoint = self._endpoint(url)
+        idempotent = endpoint in IDEMPOTENT_ENDPOINTS
+        timeout = timeout if timeout is not None else self.timeout_for(url)
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                resp = self.session.post(url, json=json, timeout=timeout, **kwargs)
+            except requests.ConnectTimeout:
+                if last_attempt:
+                    raise
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt or not idempotent:
+                    raise
+            else:
+                if last_attempt or not idempotent or resp.status_code not in RETRY_STATUSES:
+                    return resp
+                resp.close()
+
+            time.sleep(min(self.backoff * 2 ** attempt, self.max_backoff))
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def configure(**kwargs) -> ApiClient:
+    """Replace the shared client, e.g. ``configure(pool_size=20, max_retries=3)``."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = ApiClient(**kwargs)
+        return _client
+
+
+def get_client() -> ApiClient:
+    """Return the process-wide client, creating it from API_* env vars on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ApiClient(
+                    pool_size=int(os.getenv("API_POOL_SIZE", "10")),
+                    max_retries=int(os.getenv("API_MAX_RETRIES", "2")),
+                    backoff=float(os.getenv("API_RETRY_BACKOFF", "0.5")),
+                )
+    return _client
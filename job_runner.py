@@ -0,0 +1,156 @@
+# job_runner.py — background pipeline runs that pages submit, poll and pick up again after a rerun or reconnect
+import os
+import sys
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from stage_profile import StageProfile
+
+DEFAULT_WORKERS = 2
+DEFAULT_TTL_SECONDS = 60 * 60
+DEFAULT_MAX_JOBS = 50
+
+ACTIVE = ("queued", "running")
+
+
+class JobError(RuntimeError):
+    """Raised by a job to fail with a message meant for the user, shown as is."""
+
+
+class Job:
+    """
+    One submitted run: its status, the stage it is in and the ones it has
+    finished, and in the end its result or error.
+
+    The job function gets the ``Job`` and reports through ``update`` (a
+    progress fraction and message within the current stage) and ``note``
+    (lines shown with the result). A ``profile`` it sets is read for the
+    per-stage progress: its finished records and the stage it is in.
+    """
+
+    def __init__(self, job_id: str, owner=None, label: str = ""):
+        self.id = job_id
+        self.owner = owner
+        self.label = label
+        self.status = "queued"
+        self.progress = None
+        self.message = ""
+        self.notes = []
+        self.profile: StageProfile | None = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def update(self, progress: float | None = None, message: str | None = None):
+        with self._lock:
+            self.progress = progress
+            if message is not None:
+                self.message = message
+
+    def note(self, text: str):
+        with self._lock:
+            self.notes.append(text)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    def snapshot(self) -> dict:
+        """A consistent copy of the job's state for rendering: ``stages`` holds the finished ones."""
+        with self._lock:
+            profile = self.profile
+            records = list(profile.records) if profile is not None else []
+            end = self.finished or time.time()
+            return {
+                "id": self.id, "label": self.label, "status": self.status,
+                "stage": profile.current if profile is not None else None,
+                "stages": [{"stage": r["stage"], "seconds": r["seconds"], "cached": r["cached"]} for r in records],
+                "progress": self.progress, "message": self.message, "notes": list(self.notes),
+                "error": self.error, "elapsed": end - (self.started or end),
+            }
+
+
+class JobRunner:
+    """
+    Runs job functions on ``workers`` background threads.
+
+    Jobs are held in memory under a random ID, so any session that knows
+    the ID (and has the same ``owner``) can poll it and collect the result
+    until the job has been finished for ``ttl_seconds``. Beyond
+    ``max_jobs`` the oldest finished jobs are dropped first.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_jobs: int = DEFAULT_MAX_JOBS):
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, owner=None, label: str = "", **kwargs) -> str:
+        """Queue ``fn(job, *args, **kwargs)``; its return value becomes the job's result. Returns the job ID."""
+        job = Job(uuid.uuid4().hex, owner, label)
+        with self._lock:
+            self._expire()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job: Job, fn, args, kwargs):
+        with job._lock:
+            job.status, job.started = "running", time.time()
+        result, error = None, None
+        try:
+            result = fn(job, *args, **kwargs)
+        except JobError as e:
+            error = str(e)
+        except Exception as e:
+            print(f"[job {job.id}] {traceback.format_exc()}", file=sys.stderr)
+            error = f"{type(e).__name__}: {e}"
+        if job.profile is not None:
+            job.profile.close()
+        # ``finished`` is set with the final status, never after it: ``_expire`` reads it for any inactive job
+        with job._lock:
+            job.finished = time.time()
+            job.result, job.error = result, error
+            job.status = "failed" if error is not None else "done"
+
+    def get(self, job_id: str, owner=None) -> Job | None:
+        """The job, or None if it is unknown, expired or belongs to another owner."""
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+        if job is None or (job.owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def _expire(self):
+        now = time.time()
+        finished = sorted((j for j in self._jobs.values() if not j.active), key=lambda j: j.finished)
+        for job in finished:
+            if now - job.finished > self.ttl_seconds or len(self._jobs) > self.max_jobs:
+                del self._jobs[job.id]
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Return the process-wide job runner, sized from JOB_WORKERS and JOB_TTL_SECONDS."""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner(
+                    workers=int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS)),
+                    ttl_seconds=float(os.getenv("JOB_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+                )
+    return _runner
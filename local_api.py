@@ -0,0 +1,175 @@
+# local_api.py — local stand-in for the store-data endpoints of the Flask API
+#
+# Run with:  python local_api.py  (then set API_URL / api_url to http://127.0.0.1:5050)
+# Serves LOCAL_API_DATA (a .parquet or .csv file) if set, otherwise
+# LOCAL_API_ROWS rows of synthetic data.
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from flask import Flask, Response, jsonify, request
+
+from store_api import ARROW_STREAM, JSON, PARQUET, aggregate_keys
+from synthetic_data import make_store_data
+
+FILTER_COLUMNS = ["Volume", "product_type", "Season", "City", "Zone", "Years"]
+
+# Columns aggregate_data groups by; rows with a null in any of them never reach filter_data
+GRAIN_COLUMNS = ["UPC_Barcode_SKU", "STORE_NAME", "DESIGN", "first_rcv_date", "Volume", "product_type", "Size", "Color"]
+DEFAULT_PAGE_SIZE = 50_000
+
+app = Flask(__name__)
+_STORE_DATA = None
+
+
+def _store_data() -> pd.DataFrame:
+    global _STORE_DATA
+    if _STORE_DATA is None:
+        path = os.getenv("LOCAL_API_DATA", "").strip()
+        if path.endswith(".parquet"):
+            _STORE_DATA = pd.read_parquet(path)
+        elif path:
+            _STORE_DATA = pd.read_csv(path, parse_dates=["first_rcv_date"])
+        else:
+            _STORE_DATA = make_store_data(int(os.getenv("LOCAL_API_ROWS", "100000")))
+    return _STORE_DATA
+
+
+def apply_filters(df: pd.DataFrame, payload: dict) -> pd.DataFrame:
+    """Keep rows matching every filter in the payload; None / [] / "All" mean no filter."""
+    mask = pd.Series(True, index=df.index)
+    for col in FILTER_COLUMNS:
+        value = payload.get(col)
+        if value in (None, "", "All", []) or col not in df.columns:
+            continue
+        values = value if isinstance(value, list) else [value]
+        values = [v for v in values if v != "All"]
+        if values:
+            mask &= df[col].astype(str).isin([str(v) for v in values])
+    return df[mask]
+
+
+def apply_prefilter(df: pd.DataFrame, prefilter: dict, scope_df: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Drop every SKU that cannot pass ``filter_data`` (see ``store_api.make_prefilter``).
+
+    Sell-through and age are computed per SKU (and partition) exactly as the
+    pipeline does, over ``scope_df`` when the request is one shard of a
+    larger load. Removing whole SKUs leaves every other SKU's results unchanged.
+    """
+    scope_df = df if scope_df is None else scope_df
+    partition = prefilter.get("partition")
+    keys = ["UPC_Barcode_SKU"] + ([partition] if partition else [])
+
+    valid = scope_df.dropna(subset=list(dict.fromkeys(GRAIN_COLUMNS + keys)))
+    totals = valid.groupby(keys, observed=True).agg(
+        sold=("Sold_Qty", "sum"),
+        received=("Shop_Rcv_Qty", "sum"),
+        dispatched=("Disp_Qty", "sum"),
+        first_rcv=("first_rcv_date", "min"),
+    )
+    sell_through = (totals["sold"] / (totals["received"] - totals["dispatched"]) * 100)
+    sell_through = sell_through.replace([np.inf, -np.inf, np.nan], 0).astype(int)
+
+    threshold = pd.Timestamp(prefilter["threshold_date"])
+    as_of = pd.Timestamp(prefilter["as_of"]).normalize()
+    age = (as_of - totals["first_rcv"].clip(lower=threshold)).dt.days
+
+    passing = totals.index[(sell_through > prefilter["sell_through_threshold"]) & (age > prefilter["min_age_days"])]
+    row_keys = pd.MultiIndex.from_frame(df[keys]) if partition else df["UPC_Barcode_SKU"]
+    return df[np.asarray(row_keys.isin(passing))]
+
+
+def apply_aggregate(df: pd.DataFrame, aggregate: dict) -> pd.DataFrame:
+    """Return ``aggregate_data``'s result: quantities summed per grain, dates clamped to the launch date."""
+    keys = aggregate_keys(aggregate.get("partition"))
+    df = df.assign(Adjusted_first_Rcv_Date=df["first_rcv_date"].clip(lower=pd.Timestamp(aggregate["threshold_date"])))
+    return df.groupby(keys, observed=True)[["Shop_Rcv_Qty", "Disp_Qty", "OH_Qty", "Sold_Qty"]].sum().reset_index()
+
+
+def encode_json(df: pd.DataFrame, next_cursor=None, total_rows=None) -> str:
+    """Encode one page in the JSON envelope the real API uses."""
+    records = df.to_json(orient="records", date_format="iso")
+    return (
+        '{"success": true, "total_rows": ' + json.dumps(total_rows)
+        + ', "next_cursor": ' + json.dumps(next_cursor)
+        + ', "data": ' + records + "}"
+    )
+
+
+def encode_arrow(df: pd.DataFrame, batch_rows: int = DEFAULT_PAGE_SIZE) -> bytes:
+    """Encode the frame as an Arrow IPC stream of ``batch_rows``-row batches."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=batch_rows)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_parquet(df: pd.DataFrame, row_group_rows: int = DEFAULT_PAGE_SIZE) -> bytes:
+    """Encode the frame as Parquet with ``row_group_rows``-row row groups."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, row_group_size=row_group_rows)
+    return sink.getvalue().to_pybytes()
+
+
+def _preferred_format() -> str:
+    best = request.accept_mimetypes.best_match([ARROW_STREAM, PARQUET, JSON], default=JSON)
+    return best or JSON
+
+
+@app.post("/store_data")
+def store_data():
+    payload = request.get_json(force=True) or {}
+    df = apply_filters(_store_data(), payload)
+    prefilter = payload.get("prefilter")
+    if prefilter:
+        scope = prefilter.get("scope")
+        scope_df = apply_filters(_store_data(), dict(payload, **scope)) if scope else None
+        df = apply_prefilter(df, prefilter, scope_df)
+    aggregate = payload.get("aggregate")
+    if aggregate:
+        df = apply_aggregate(df, aggregate)
+    page_size = int(payload.get("page_size") or DEFAULT_PAGE_SIZE)
+    total_rows = len(df)
+
+    fmt = _preferred_format()
+    if fmt == ARROW_STREAM:
+        body = encode_arrow(df, page_size)
+        return Response(body, mimetype=ARROW_STREAM, headers={"X-Total-Rows": str(total_rows)})
+    if fmt == PARQUET:
+        body = encode_parquet(df, page_size)
+        return Response(body, mimetype=PARQUET, headers={"X-Total-Rows": str(total_rows)})
+
+    start = int(payload.get("cursor") or 0)
+    end = start + page_size
+    next_cursor = str(end) if end < total_rows else None
+    body = encode_json(df.iloc[start:end], next_cursor=next_cursor, total_rows=total_rows)
+    return Response(body, mimetype=JSON)
+
+
+@app.post("/unique_values")
+def unique_values():
+    payload = request.get_json(force=True) or {}
+    df = _store_data()
+
+    # Batched form: {"columns": [...]} -> {"values": {column: [...]}}
+    columns = payload.get("columns")
+    if columns is None:
+        columns = [payload.get("column")]
+    unknown = [col for col in columns if col not in df.columns]
+    if unknown:
+        return jsonify({"success": False, "error": f"Unknown column: {', '.join(map(str, unknown))}"})
+
+    values = {col: sorted(df[col].dropna().unique().tolist()) for col in columns}
+    if "columns" in payload:
+        return jsonify({"success": True, "values": values})
+    return jsonify({"success": True, "values": values[columns[0]]})
+
+
+if __name__ == "__main__":
+    app.run(host="127.0.0.1", port=int(os.getenv("LOCAL_API_PORT", "5050")), threaded=True)
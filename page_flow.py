@@ -0,0 +1,388 @@
+# page_flow.py — the Process Data flow shared by the Network, City and Regional pages: load, run, poll, download
+import json
+import time
+
+import streamlit as st
+
+from artifact_cache import get_artifact_cache
+from data_export import FORMATS, ZIP_MIME, bundle_bytes, export_bytes, store_slips_bytes
+from db_loader import iter_store_data_db, load_store_data_db
+from excel_export import XLSX_MIME, to_excel_bytes
+from job_runner import ACTIVE, Job, JobError, get_job_runner
+from result_cache import get_cache
+from stage_cache import get_stage_cache
+from stage_profile import StageProfile, profiled
+from store_api import (
+    ShardFetchError,
+    StoreDataError,
+    empty_store_frame,
+    get_filter_options,
+    iter_store_data,
+    load_store_data,
+    make_aggregate,
+    make_prefilter,
+    payload_covers,
+)
+from transfer_engine import PARTITIONS, MemoryBudgetError, PipelineError, aggregate_chunks, run_pipeline
+
+# 🔗 Flask+ngrok base URL from Streamlit secrets
+API_URL = st.secrets.get("api_url")  # e.g. "https://abcd-xyz.ngrok-free.app"
+
+# "db" reads dbo.Product_Data directly (see db_loader.py) instead of calling the API
+DATA_SOURCE = st.secrets.get("data_source", "api")
+
+# Worker processes for the per-SKU columns, used once the aggregated pull has at least
+# pipeline_parallel_min_rows rows (unset = always run in the script thread; measure the break-even
+# with benchmarks/bench_transfer_engine.py --workers before turning it on)
+PIPELINE_WORKERS = int(st.secrets.get("pipeline_workers", 1))
+PIPELINE_PARALLEL_MIN_ROWS = st.secrets.get("pipeline_parallel_min_rows")
+
+# Memory budget (MB) for summing pulls page by page instead of loading every row first (unset = off)
+PIPELINE_MEMORY_MB = st.secrets.get("pipeline_memory_mb")
+
+# Carry only the columns each stage reads through the pipeline; descriptive columns are joined back at the end
+PIPELINE_LEAN = bool(st.secrets.get("pipeline_lean", False))
+
+# Per-stage timings: "off", "rss" or "tracemalloc" (exact allocations, slower); optional JSON-lines log file
+PIPELINE_PROFILE = st.secrets.get("pipeline_profile", "off")
+PIPELINE_PROFILE_LOG = st.secrets.get("pipeline_profile_log")
+
+# Multi-select filters whose values are loaded as separate, concurrent requests
+SHARD_COLUMNS = ("Years", "Season")
+
+# Seconds between status checks while a Process Data job runs in the background
+JOB_POLL_SECONDS = float(st.secrets.get("job_poll_seconds", 1.0))
+
+# Per page: the column transfers stay within, the download file names, the Excel sheet name and whether the
+# processed rows are shown under the run
+PAGES = {
+    "Network": {"partition": PARTITIONS["Network"], "processed": "processed_data", "transfers": "transfer_details",
+                "bundle": "network_results", "sheet_name": "Sheet1", "show_table": False},
+    "City": {"partition": PARTITIONS["City"], "processed": "processed_city", "transfers": "transfer_details_city",
+             "bundle": "city_results", "sheet_name": "Transfer Details", "show_table": True},
+    "Regional": {"partition": PARTITIONS["Zone"], "processed": "processed_regional",
+                 "transfers": "transfer_details_regional", "bundle": "regional_results",
+                 "sheet_name": "Processed Data", "show_table": True},
+}
+
+
+def loaded_data_key(page: str) -> str:
+    """Session-state slot for the page's last loaded dataset, reused while only thresholds tighten."""
+    return f"loaded_store_data_{page.lower()}"
+
+
+def job_key(page: str) -> str:
+    """Session-state slot for the page's Process Data job ID (also kept in the URL as ?job=)."""
+    return f"job_{page.lower()}"
+
+
+def make_load_payload(filters: dict, prefilter=None, aggregate=None) -> dict:
+    """The /store_data payload: the signed-in user, ``filters`` by column (None = all) and the optional blocks."""
+    payload = {"user_id": st.session_state["user_id"], **filters}
+    if prefilter:
+        # 🔹 Let the server drop SKUs that cannot pass the thresholds
+        payload["prefilter"] = prefilter
+    if aggregate:
+        # 🔹 Ask for rows already summed to aggregate_data's grain
+        payload["aggregate"] = aggregate
+    return payload
+
+
+def load_data_from_db(job: Job, payload: dict, refresh=False, aggregate=None):
+    """
+    Load ``payload``'s rows on a Process Data job's thread. Nothing here
+    touches Streamlit: progress and captions go to the job, and failures
+    are raised as ``JobError`` with the message the page shows.
+    """
+    # 🔹 /store_data is streamed page by page; the first page sizes the bar
+    job.update(0.0, "Loading store data...")
+
+    def _on_page(rows_loaded, total_rows):
+        if total_rows:
+            job.update(min(rows_loaded / total_rows, 1.0), f"Loaded {rows_loaded:,} of {total_rows:,} rows")
+        else:
+            job.update(None, f"Loaded {rows_loaded:,} rows")
+
+    try:
+        # 🔹 Repeat runs over the same filters are served from the on-disk cache
+        # 🔹 Multi-select Years/Season are fetched as concurrent shards
+        memory = {}
+        if PIPELINE_MEMORY_MB and aggregate:
+            # 🔹 Sum each page to the aggregate grain as it arrives; raw rows are never held together
+            if DATA_SOURCE == "db":
+                chunks = iter_store_data_db(payload, on_page=_on_page)
+            else:
+                chunks = iter_store_data(API_URL, payload, on_page=_on_page)
+            df = aggregate_chunks(chunks, aggregate["threshold_date"], aggregate["partition"],
+                                  max_bytes=int(float(PIPELINE_MEMORY_MB) * 1024 ** 2), stats=memory)
+            job.note(f"Aggregated {memory['rows']:,} rows in {memory['chunks']} chunks to {len(df):,} · "
+                     f"peak {memory['peak_bytes'] / 1e6:,.1f} MB of {float(PIPELINE_MEMORY_MB):,.0f} MB")
+        elif DATA_SOURCE == "db":
+            df = load_store_data_db(payload, on_page=_on_page, cache=get_cache(), refresh=refresh, stats=memory)
+        else:
+            df = load_store_data(API_URL, payload, on_page=_on_page, cache=get_cache(), refresh=refresh,
+                                 shard_by=SHARD_COLUMNS, stats=memory)
+
+        # 🔹 Report the footprint of the compact schema (categoricals, Int32 quantities)
+        if "before_bytes" in memory:
+            job.note(f"Loaded {len(df):,} rows · memory {memory['before_bytes'] / 1e6:,.1f} MB "
+                     f"→ {memory['after_bytes'] / 1e6:,.1f} MB after compaction")
+        elif "after_bytes" in memory:
+            job.note(f"Loaded {len(df):,} rows from cache · memory {memory['after_bytes'] / 1e6:,.1f} MB")
+        return df
+
+    except ShardFetchError as e:
+        raise JobError(f"API error: {e}. Not processing a partial dataset.") from e
+
+    except StoreDataError as e:
+        raise JobError(f"API error: {e}") from e
+
+    except MemoryBudgetError as e:
+        raise JobError(f"Not enough memory for this pull: {e}") from e
+
+    except Exception as e:
+        raise JobError(f"API Error while loading data: {e}") from e
+
+    finally:
+        job.update(None, "")
+
+
+def get_filter_values(columns: list):
+    """
+    Fetch the filter options for every column in one /unique_values call.
+    Returns {column: ["All", ...values]}.
+    """
+    if "user_id" not in st.session_state:
+        st.error("User ID not found.")
+        return {col: ["All"] for col in columns}
+
+    try:
+        result = get_filter_options(API_URL, st.session_state["user_id"], columns)
+        for col, err in result.errors.items():
+            st.warning(f"Could not load {col} options: {err}")
+        return {col: ["All"] + result.results.get(col, []) for col in columns}
+
+    except StoreDataError as e:
+        st.error(f"API error (unique_values): {e}")
+        return {col: ["All"] for col in columns}
+
+    except Exception as e:
+        st.error(f"API Error while loading filter values: {e}")
+        return {col: ["All"] for col in columns}
+
+
+def show_stage_profile(profile: StageProfile):
+    """Collapsible table of the run's stage timings."""
+    table = profile.frame()
+    table["memory_delta"] = table["memory_delta"] / 1e6
+    table["memory_peak"] = table["memory_peak"] / 1e6
+    with st.expander(f"Stage timings · {table['seconds'].sum():.2f} s"):
+        st.dataframe(table.rename(columns={"memory_delta": "memory Δ MB", "memory_peak": "memory peak MB"}),
+                     hide_index=True)
+
+
+def process_data_job(job: Job, page: str, payload: dict, loaded, refresh, aggregate, threshold_date,
+                     sell_through_threshold, days_threshold, parameters: dict) -> dict:
+    """
+    The Process Data run, on a job thread: load the rows (or reuse
+    ``loaded``, a dataset that already covers ``payload``) and run the
+    pipeline over ``page``'s partition, every stage measured in the job's
+    profile for the progress display. Returns what ``show_job`` renders
+    and keeps.
+    """
+    # 🔹 Per-stage timings always feed the progress display; "off" only hides the table and skips the log
+    job.profile = StageProfile(PIPELINE_PROFILE if PIPELINE_PROFILE != "off" else "rss", page=page,
+                               threshold_date=str(threshold_date), sell_through_threshold=sell_through_threshold,
+                               days_threshold=days_threshold)
+    result = {"parameters": parameters, "loaded": None, "filtered_data": None, "transfer_details": None,
+              "stage_report": {}}
+    try:
+        with profiled(job.profile, "load") as record:
+            if loaded is None:
+                loaded = load_data_from_db(job, payload, refresh, aggregate)
+                result["loaded"] = {"payload": payload, "data": loaded}
+            record["rows_out"] = len(loaded)
+            if loaded.empty:
+                if not payload.get("prefilter"):
+                    return result
+                # 🔹 The prefilter excluded every SKU: nothing passes the thresholds, so the run yields empty
+                #    results (with all their columns) rather than "no data"
+                if not len(loaded.columns):
+                    loaded = empty_store_frame(payload)
+
+        # Step-by-step data processing (shared with the other pages)
+        # 🔹 Stages whose inputs did not change since the last run are reused
+        try:
+            result["filtered_data"], result["transfer_details"] = run_pipeline(
+                loaded, threshold_date, sell_through_threshold, days_threshold, partition=PAGES[page]["partition"],
+                workers=PIPELINE_WORKERS,
+                parallel_min_rows=int(PIPELINE_PARALLEL_MIN_ROWS) if PIPELINE_PARALLEL_MIN_ROWS else None,
+                cache=get_stage_cache(), stages=result["stage_report"], profile=job.profile, lean=PIPELINE_LEAN
+            )
+        except PipelineError as e:
+            raise JobError(f"Error: {e}") from e
+        return result
+    finally:
+        if PIPELINE_PROFILE != "off" and PIPELINE_PROFILE_LOG:
+            job.profile.write_jsonl(PIPELINE_PROFILE_LOG)
+
+
+def submit_process_data(page: str, filters: dict, threshold_date, sell_through_threshold, days_threshold,
+                        refresh=False):
+    """
+    Start ``page``'s Process Data job for ``filters`` (by /store_data
+    column) unless one is still running. The job ID is kept in session
+    state and the URL, so reruns and reconnects pick it up again.
+    """
+    key = job_key(page)
+    running = st.session_state.get(key)
+    running = get_job_runner().get(running, owner=st.session_state.get("user_id")) if running else None
+    if "user_id" not in st.session_state:
+        st.error("User ID not found. Please log in.")
+        return
+    if running is not None and running.active:
+        st.info("Data is already being processed; the results will appear below.")
+        return
+
+    partition = PAGES[page]["partition"]
+    payload = make_load_payload(
+        filters,
+        prefilter=make_prefilter(threshold_date, sell_through_threshold, days_threshold, partition=partition),
+        aggregate=make_aggregate(threshold_date, partition=partition),
+    )
+    # 🔹 Same filters, thresholds no looser than the last load: its rows already hold every passing SKU
+    loaded = st.session_state.get(loaded_data_key(page))
+    if refresh or loaded is None or not payload_covers(loaded["payload"], payload):
+        loaded = None
+    parameters = {
+        "page": page, "threshold_date": str(threshold_date),
+        "sell_through_threshold": sell_through_threshold, "days_threshold": days_threshold,
+        "filters": filters,
+    }
+    job_id = get_job_runner().submit(
+        process_data_job, page, payload, loaded["data"] if loaded else None, refresh, payload.get("aggregate"),
+        threshold_date, sell_through_threshold, days_threshold, parameters,
+        owner=st.session_state["user_id"], label=page,
+    )
+    st.session_state[key] = job_id
+    st.query_params["job"] = job_id
+
+
+def show_job(page: str, job_id: str):
+    """
+    ``page``'s Process Data job: its stages and progress while it runs,
+    polled every JOB_POLL_SECONDS, then its result. A finished result is
+    copied to session state once, for the downloads.
+    """
+    key = job_key(page)
+    if "user_id" not in st.session_state:
+        st.info("Please log in to see the results of the last run.")
+        return
+    job = get_job_runner().get(job_id, owner=st.session_state["user_id"])
+    if job is None:
+        # 🔹 Expired or unknown: forget it; results already copied to session state stay available
+        st.session_state.pop(key, None)
+        st.query_params.pop("job", None)
+        if st.session_state.get(key + "_applied") != job_id:
+            st.info("The last run is no longer available. Please process the data again.")
+        return
+    status = job.snapshot()
+    finished = " · ".join(f"{s['stage']} {s['seconds']:.1f} s" + (" (cached)" if s["cached"] else "")
+                          for s in status["stages"])
+
+    if status["status"] in ACTIVE:
+        st.info(f"Processing data, please wait... {status['stage'] or status['status']} · "
+                f"{status['elapsed']:.0f} s")
+        if status["progress"] is not None:
+            st.progress(status["progress"], text=status["message"] or None)
+        elif status["message"]:
+            st.caption(status["message"])
+        if finished:
+            st.caption("Finished: " + finished)
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
+    for note in status["notes"]:
+        st.caption(note)
+    if status["status"] == "failed":
+        st.error(status["error"])
+    elif job.result["filtered_data"] is None:
+        st.warning("No data found for selected filters.")
+    else:
+        result = job.result
+        if st.session_state.get(key + "_applied") != job_id:
+            # 🔹 Store results in session state
+            if result["loaded"] is not None:
+                st.session_state[loaded_data_key(page)] = result["loaded"]
+            st.session_state.filtered_data = result["filtered_data"]
+            st.session_state.transfer_details = result["transfer_details"]
+            st.session_state.run_parameters = result["parameters"]
+            st.session_state[key + "_applied"] = job_id
+        if result["filtered_data"].empty:
+            st.info("No SKU passes the sell-through and age thresholds for these filters.")
+        st.caption("Pipeline stages: " + " · ".join(
+            f"{name} {'(cached)' if how == 'hit' else '(ran)'}" for name, how in result["stage_report"].items()
+        ))
+        if PAGES[page]["show_table"]:
+            st.dataframe(result["filtered_data"])
+    if PIPELINE_PROFILE != "off" and job.profile is not None:
+        show_stage_profile(job.profile)
+
+
+def show_results(page: str):
+    """The page's current or last Process Data job, then the downloads of the results in session state."""
+    job_id = st.session_state.get(job_key(page)) or st.query_params.get("job")
+    if job_id:
+        show_job(page, job_id)
+
+    if "filtered_data" in st.session_state and "transfer_details" in st.session_state:
+        show_downloads(page, st.session_state.filtered_data, st.session_state.transfer_details,
+                       st.session_state.get("run_parameters", {}))
+
+
+# ================== DOWNLOADS ==================
+def download_artifact(container, label, frames, kind, build, file_name, mime):
+    """
+    A download button for an export of ``frames``. The file is only built
+    once asked for, then cached by the frames' content, so reruns reuse it.
+    The caption beside it gives the time it took to write and its size.
+    """
+    cache = get_artifact_cache()
+    stats = {}
+    body = cache.get(frames, kind, stats)
+    if body is None:
+        if not container.button(f"Prepare {file_name}"):
+            return
+        with st.spinner(f"Writing {file_name}..."):
+            body = cache.get_or_build(frames, kind, build, stats)
+    container.download_button(label=label, data=body, file_name=file_name, mime=mime)
+    container.caption(f"{stats['seconds']:.1f} s · {stats['bytes'] / 1024 ** 2:.1f} MB")
+
+
+def show_downloads(page: str, processed, transfers, parameters):
+    """
+    Excel, gzipped CSV and Parquet files of both results, a zip of the two
+    with the run parameters, and a zip of per-store transfer pick lists,
+    named after ``page``'s files.
+    """
+    spec = PAGES[page]
+    sheet_name = spec["sheet_name"]
+    for label, df, name in (("Processed Data", processed, spec["processed"]),
+                            ("Transfer Details", transfers, spec["transfers"])):
+        xlsx, csv, parquet = st.columns(3)
+        # Written batch by batch in constant-memory mode, through a spooled temp file
+        download_artifact(xlsx, f"Download {label}", df, f"xlsx:{sheet_name}",
+                          lambda df=df: to_excel_bytes(df, sheet_name=sheet_name), f"{name}.xlsx", XLSX_MIME)
+        for container, fmt in ((csv, "csv.gz"), (parquet, "parquet")):
+            download_artifact(container, f"Download {label} ({fmt})", df, fmt,
+                              lambda df=df, fmt=fmt: export_bytes(df, fmt), f"{name}.{fmt}", FORMATS[fmt][0])
+    download_artifact(st, "Download All (zip)", (processed, transfers),
+                      "zip:" + json.dumps(parameters, sort_keys=True, default=str),
+                      lambda: bundle_bytes({spec["processed"]: processed, spec["transfers"]: transfers}, parameters),
+                      f"{spec['bundle']}.zip", ZIP_MIME)
+
+    by = ["From Store"]
+    if st.checkbox("One pick list per From and To Store pair", key="slips_by_pair"):
+        by.append("To Store")
+    download_artifact(st, "Download Store Pick Lists (zip)", transfers, "slips:" + ",".join(by),
+                      lambda: store_slips_bytes(transfers, by), f"{spec['transfers']}_by_store.zip", ZIP_MIME)
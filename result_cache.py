@@ -0,0 +1,146 @@
+# result_cache.py — on-disk Parquet cache for loader results
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+# ---------- CONFIG ----------
+DEFAULT_CACHE_DIR = os.path.join(".cache", "store_data")
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def normalize_filters(filters: dict) -> tuple:
+    """
+    Turn a filter payload into a canonical, hashable tuple.
+
+    None, "", "All" and empty lists mean "no filter" and are dropped; scalars
+    and lists are compared as sorted tuples of strings, so the Network page's
+    ``["2024"]`` and the City page's ``2024`` hit the same entry. Nested
+    blocks such as ``prefilter`` are compared by their sorted JSON.
+    """
+    items = []
+    for name in sorted(filters):
+        value = filters[name]
+        if isinstance(value, dict):
+            value = json.dumps(value, sort_keys=True, default=str)
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        values = sorted({str(v) for v in values if v not in (None, "", "All")})
+        if values:
+            items.append((name, tuple(values)))
+    return tuple(items)
+
+
+class ResultCache:
+    """
+    Parquet files keyed by ``(user_id, endpoint, normalized filters)``.
+
+    An entry's mtime is its write time and is used for the TTL; its atime is
+    bumped on every hit and drives LRU eviction once the directory grows past
+    ``max_bytes``.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(user_id, endpoint: str, filters: dict) -> str:
+        raw = json.dumps([str(user_id), endpoint, normalize_filters(filters)])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        now = time.time()
+        if now - stat.st_mtime > self.ttl_seconds:
+            self.invalidate(key)
+            return None
+
+        try:
+            df = pd.read_parquet(path)
+        except (OSError, ValueError):
+            # Half-written or corrupted entry: drop it and refetch
+            self.invalidate(key)
+            return None
+
+        os.utime(path, (now, stat.st_mtime))
+        return df
+
+    def put(self, key: str, df: pd.DataFrame):
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def invalidate(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".parquet"):
+                self.invalidate(name[:-len(".parquet")])
+
+    def _evict(self):
+        """Drop expired entries, then least-recently-used ones until under ``max_bytes``."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".parquet"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.ttl_seconds:
+                    self.invalidate(entry.name[:-len(".parquet")])
+                    continue
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResultCache:
+    """Return the process-wide cache configured from STORE_CACHE_* env vars."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache(
+                    directory=os.getenv("STORE_CACHE_DIR", DEFAULT_CACHE_DIR),
+                    ttl_seconds=float(os.getenv("STORE_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                    max_bytes=int(float(os.getenv("STORE_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 ** 2)) * 1024 ** 2),
+                )
+    return _cache
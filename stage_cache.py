@@ -0,0 +1,126 @@
+# stage_cache.py — in-memory memo of transfer-pipeline intermediates
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from stage_profile import StageProfile, profiled, row_count
+from store_api import frame_memory
+
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+
+def fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a frame: its columns, dtypes and every value."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def stage_key(upstream: str, stage: str, params: tuple) -> str:
+    """Key of a stage's output: its upstream stage's key plus the parameters it reads itself."""
+    raw = json.dumps([upstream, stage, [str(p) for p in params]])
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _value_bytes(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return frame_memory(value)
+    if isinstance(value, tuple):
+        return sum(_value_bytes(v) for v in value)
+    return 0
+
+
+class StageCache:
+    """
+    Least-recently-used stage outputs, kept under ``max_bytes``.
+
+    Values are shared, not copied: stages must not modify a frame they got
+    from an upstream stage in place.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, value):
+        size = _value_bytes(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class StageRunner:
+    """
+    Runs pipeline stages in order, reusing memoized outputs where the inputs match.
+
+    Each stage's key chains its upstream key with its own parameters, so a
+    changed parameter misses at that stage and every stage after it, while
+    the stages before it still hit. ``report`` records ``"hit"`` or ``"run"``
+    per stage name; a ``profile`` measures every stage, hits included.
+    """
+
+    def __init__(self, cache: StageCache | None, data_key: str, report: dict | None = None,
+                 profile: StageProfile | None = None):
+        self.cache = cache
+        self.key = data_key
+        self.report = report
+        self.profile = profile
+
+    def run(self, stage: str, params: tuple, compute, rows_in: int | None = None):
+        self.key = stage_key(self.key, stage, params)
+        with profiled(self.profile, stage, rows_in) as record:
+            value = self.cache.get(self.key) if self.cache is not None else None
+            hit = value is not None
+            if not hit:
+                value = compute()
+                if self.cache is not None:
+                    self.cache.put(self.key, value)
+            record["cached"] = hit
+            record["rows_out"] = row_count(value)
+        if self.report is not None:
+            self.report[stage] = "hit" if hit else "run"
+        return value
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_stage_cache() -> StageCache:
+    """Return the process-wide stage cache, sized from STAGE_CACHE_MAX_MB."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = StageCache(
+                    max_bytes=int(float(os.getenv("STAGE_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 ** 2)) * 1024 ** 2),
+                )
+    return _cache
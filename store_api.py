@@ -0,0 +1,575 @@
+# store_api.py — client for the store-data endpoints of the Flask API
+import itertools
+import threading
+import time
+from datetime import date
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import requests
+from pandas.api.types import union_categoricals
+
+from fanout import DEFAULT_MAX_WORKERS, FanOutResult, fan_out
+from http_client import get_client
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+JSON = "application/json"
+
+# Accept headers per wire format. "auto" lets the server pick the best body it
+# can produce; JSON stays the fallback for servers without columnar support.
+ACCEPT_HEADERS = {
+    "auto": f"{ARROW_STREAM}, {PARQUET};q=0.9, {JSON};q=0.5",
+    "arrow": f"{ARROW_STREAM}, {JSON};q=0.5",
+    "parquet": f"{PARQUET}, {JSON};q=0.5",
+    "json": JSON,
+}
+
+NUMERIC_COLUMNS = ["Sold_Qty", "Shop_Rcv_Qty", "Disp_Qty", "OH_Qty"]
+
+# Low-cardinality dimensions stored as categoricals at ingest
+DIMENSION_COLUMNS = ["STORE_NAME", "DESIGN", "Color", "Size", "Volume", "product_type", "City", "Zone"]
+
+DATE_COLUMNS = ["first_rcv_date", "Adjusted_first_Rcv_Date"]
+
+# Columns of a raw /store_data row that the transfer pipeline reads (besides the quantities)
+STORE_COLUMNS = ["UPC_Barcode_SKU", "STORE_NAME", "DESIGN", "first_rcv_date", "Volume", "product_type", "Size",
+                 "Color", "City", "Zone"]
+
+# Grain of aggregate_data; with ``aggregate`` push-down the server returns rows at
+# this grain (plus the City/Zone partition) with the four quantities summed.
+AGGREGATE_KEYS = ["UPC_Barcode_SKU", "STORE_NAME", "DESIGN", "Adjusted_first_Rcv_Date",
+                  "Volume", "product_type", "Size", "Color"]
+
+# The summed quantities, in aggregate_data's column order
+QUANTITY_COLUMNS = ["Shop_Rcv_Qty", "Disp_Qty", "OH_Qty", "Sold_Qty"]
+
+# Seconds a user's filter option lists are reused before /unique_values is asked again.
+FILTER_OPTIONS_TTL = 300
+
+# Rows requested per /store_data page. Peak memory while loading is bounded by
+# one decoded page plus the typed chunks collected so far.
+DEFAULT_PAGE_SIZE = 50_000
+
+
+class StoreDataError(RuntimeError):
+    """Raised when the API reports a failure while serving store data."""
+
+
+class ShardFetchError(StoreDataError):
+    """
+    Raised when some shards of a sharded load failed.
+
+    ``partial`` holds the rows of the shards that did arrive and ``errors``
+    maps each failed shard to its exception. Transfers computed from a
+    partial network would be wrong, so callers should not process it silently.
+    """
+
+    def __init__(self, partial: pd.DataFrame, errors: dict):
+        self.partial = partial
+        self.errors = errors
+        failed = "; ".join(f"{_shard_label(key)}: {err}" for key, err in errors.items())
+        super().__init__(f"{len(errors)} shard(s) failed to load ({failed})")
+
+
+def _shard_label(key: tuple) -> str:
+    return ", ".join(f"{col}={value}" for col, value in key)
+
+
+def normalize_store_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the column naming and dtype rules the transfer pages expect."""
+    # 🔹 Normalize column names
+    df.columns = df.columns.str.strip()
+    df.columns = df.columns.str.replace(" ", "_")
+
+    # 🔹 Standardize 'first_rcv_date' naming if DB returns different spelling/case
+    for col in df.columns:
+        if col.lower() == "first_rcv_date":
+            if col != "first_rcv_date":
+                df = df.rename(columns={col: "first_rcv_date"})
+            break
+
+    # 🔹 Convert key columns to correct numeric types
+    for c in NUMERIC_COLUMNS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+
+    # 🔹 Convert date columns to datetime
+    for c in DATE_COLUMNS:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+
+    return df
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """Bytes held by the frame, counting the Python string objects in object columns."""
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def compact_store_frame(df: pd.DataFrame, stats: dict | None = None) -> pd.DataFrame:
+    """
+    Apply the memory-compact ingest schema.
+
+    Dimension columns become categoricals and whole-number quantity columns
+    become nullable Int32 (``pd.to_numeric(errors="coerce")`` otherwise leaves
+    them float64). Quantities with fractions or values outside int32 keep
+    their dtype. When ``stats`` is given, ``before_bytes`` / ``after_bytes``
+    are accumulated into it.
+    """
+    if stats is not None:
+        stats["before_bytes"] = stats.get("before_bytes", 0) + frame_memory(df)
+
+    for c in DIMENSION_COLUMNS:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+
+    int32 = np.iinfo(np.int32)
+    for c in NUMERIC_COLUMNS:
+        if c not in df.columns or df[c].dtype == "Int32":
+            continue
+        values = df[c].dropna()
+        if values.empty or ((values % 1 == 0).all() and values.between(int32.min, int32.max).all()):
+            df[c] = df[c].astype("Int32")
+
+    if stats is not None:
+        stats["after_bytes"] = stats.get("after_bytes", 0) + frame_memory(df)
+    return df
+
+
+def empty_store_frame(payload: dict, compact: bool = True) -> pd.DataFrame:
+    """
+    The frame a load of ``payload`` returns when no row came back, e.g.
+    because the ``prefilter`` excluded every SKU: no rows, but the columns
+    and dtypes of raw rows (or of aggregated ones, when ``payload`` asks
+    for ``aggregate``), so the pipeline still yields its empty results.
+    """
+    aggregate = payload.get("aggregate")
+    columns = aggregate_keys(aggregate.get("partition")) if aggregate else STORE_COLUMNS
+    df = normalize_store_frame(pd.DataFrame({c: pd.Series(dtype=object) for c in columns + QUANTITY_COLUMNS}))
+    return compact_store_frame(df) if compact else df
+
+
+def concat_store_frames(chunks: list) -> pd.DataFrame:
+    """
+    Concatenate typed chunks, merging categorical columns without decoding them.
+
+    ``pd.concat`` falls back to object dtype when the chunks' categories
+    differ, which would undo the compaction; ``union_categoricals`` does not.
+    """
+    if len(chunks) == 1:
+        return chunks[0]
+
+    columns = list(chunks[0].columns)
+    categorical = [
+        c for c in columns
+        if all(c in chunk.columns and isinstance(chunk[c].dtype, pd.CategoricalDtype) for chunk in chunks)
+    ]
+    df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    for c in categorical:
+        # Sorted categories keep groupby output (and so transfer order) independent of paging
+        df[c] = union_categoricals([chunk[c] for chunk in chunks], sort_categories=True)
+    return df[columns + [c for c in df.columns if c not in columns]]
+
+
+def make_prefilter(threshold_date, sell_through_threshold, days_threshold, partition: str | None = None,
+                   as_of=None) -> dict:
+    """
+    Build the ``prefilter`` block that lets the server skip SKUs ``filter_data`` would drop.
+
+    A SKU (per ``partition`` value on the City/Regional pages) is only
+    shipped if its network sell-through is above ``sell_through_threshold``
+    and its age, counted from the later of its first receive date and
+    ``threshold_date`` up to ``as_of``, is above ``days_threshold``. The
+    client still applies ``filter_data``, so servers that ignore the block
+    return the same results, only slower.
+    """
+    return {
+        "threshold_date": str(threshold_date)[:10],
+        "as_of": str(as_of or date.today())[:10],
+        "sell_through_threshold": sell_through_threshold,
+        "min_age_days": days_threshold,
+        "partition": partition,
+    }
+
+
+def prefilter_covers(loaded: dict | None, wanted: dict | None) -> bool:
+    """
+    True if rows loaded under the ``loaded`` prefilter hold every SKU ``wanted`` would keep.
+
+    Raising either threshold only drops SKUs, so a load made with looser
+    thresholds (or none) can be filtered again on the client instead of
+    being fetched.
+    """
+    if loaded is None:
+        return True
+    if wanted is None:
+        return False
+    same = all(loaded.get(k) == wanted.get(k) for k in ("threshold_date", "as_of", "partition"))
+    return (same and wanted["sell_through_threshold"] >= loaded["sell_through_threshold"]
+            and wanted["min_age_days"] >= loaded["min_age_days"])
+
+
+def payload_covers(loaded: dict, wanted: dict) -> bool:
+    """True if the rows loaded for payload ``loaded`` can serve payload ``wanted``; see ``prefilter_covers``."""
+    def rest(payload):
+        return {k: v for k, v in payload.items() if k != "prefilter"}
+
+    return rest(loaded) == rest(wanted) and prefilter_covers(loaded.get("prefilter"), wanted.get("prefilter"))
+
+
+def make_aggregate(threshold_date, partition: str | None = None) -> dict:
+    """
+    Build the ``aggregate`` block asking the server for pre-aggregated rows.
+
+    The server clamps ``first_rcv_date`` to ``threshold_date`` as
+    ``Adjusted_first_Rcv_Date`` and sums the quantities per
+    ``AGGREGATE_KEYS`` (plus ``partition``), so the client receives what
+    ``aggregate_data`` would have produced. Servers that ignore the block
+    return raw rows, which the pages still aggregate themselves.
+    """
+    return {"threshold_date": str(threshold_date)[:10], "partition": partition}
+
+
+def aggregate_keys(partition: str | None = None) -> list:
+    return ([partition] if partition else []) + AGGREGATE_KEYS
+
+
+def combine_aggregated(df: pd.DataFrame, partition: str | None = None) -> pd.DataFrame:
+    """
+    Put server-aggregated rows into ``aggregate_data``'s order.
+
+    Groups split across shards (or pages) are summed again, and rows are
+    sorted by the grain keys the way ``groupby`` sorts them, so downstream
+    transfer matching sees the same row order.
+    """
+    keys = aggregate_keys(partition)
+    if df.empty or not set(keys).issubset(df.columns):
+        return df
+    if df.duplicated(keys).any():
+        quantities = [c for c in QUANTITY_COLUMNS if c in df.columns]
+        return df.groupby(keys, observed=True)[quantities].sum().reset_index()
+    return df.sort_values(keys, kind="stable", ignore_index=True)
+
+
+def iter_arrow_frames(source):
+    """Decode an Arrow IPC stream batch by batch into typed DataFrames."""
+    with pa.ipc.open_stream(source) as reader:
+        for batch in reader:
+            yield normalize_store_frame(batch.to_pandas())
+
+
+def iter_parquet_frames(source):
+    """Decode a Parquet body row group by row group into typed DataFrames."""
+    parquet_file = pq.ParquetFile(source)
+    for i in range(parquet_file.num_row_groups):
+        yield normalize_store_frame(parquet_file.read_row_group(i).to_pandas())
+
+
+def json_frame(result: dict) -> pd.DataFrame:
+    """Turn one JSON page (``{"data": [...]}``) into a typed DataFrame."""
+    # Convert the page to typed columns right away so the per-row dicts
+    # can be released before the next page is requested.
+    rows = result.pop("data", None) or []
+    return normalize_store_frame(pd.DataFrame(rows))
+
+
+def iter_store_data_pages(api_url: str, payload: dict, page_size: int = DEFAULT_PAGE_SIZE, timeout=None,
+                          wire_format: str = "auto"):
+    """
+    Yield ``(chunk, total_rows)`` for each page of ``/store_data``.
+
+    The request carries ``page_size`` and, after the first page, the
+    ``cursor`` returned by the server as ``next_cursor``. ``total_rows`` is
+    whatever the server reported (usually only on the first page) or None.
+    A server that does not paginate simply answers with one page and no
+    cursor, so this also works against older API versions.
+
+    Requests go through the shared pooled client, so ``timeout=None`` means
+    the per-endpoint default. ``wire_format`` selects the Accept header. Arrow IPC bodies are decoded
+    batch by batch straight off the socket and Parquet bodies row group by
+    row group; anything else is treated as the JSON envelope.
+    """
+    headers = {"Accept": ACCEPT_HEADERS[wire_format]}
+    cursor = None
+    while True:
+        body = dict(payload, page_size=page_size)
+        if cursor is not None:
+            body["cursor"] = cursor
+
+        resp = get_client().post(f"{api_url}/store_data", json=body, headers=headers, timeout=timeout, stream=True)
+        with resp:
+            resp.raise_for_status()
+            content_type = resp.headers.get("Content-Type", "").split(";")[0].strip()
+
+            if content_type in (ARROW_STREAM, PARQUET):
+                total_rows = resp.headers.get("X-Total-Rows")
+                total_rows = int(total_rows) if total_rows else None
+                if content_type == ARROW_STREAM:
+                    resp.raw.decode_content = True
+                    frames = iter_arrow_frames(resp.raw)
+                else:
+                    frames = iter_parquet_frames(BytesIO(resp.content))
+                for chunk in frames:
+                    yield chunk, total_rows
+                cursor = resp.headers.get("X-Next-Cursor")
+
+            else:
+                result = resp.json()
+                if not result.get("success"):
+                    raise StoreDataError(result.get("error", "Unknown error"))
+                yield json_frame(result), result.get("total_rows")
+                cursor = result.get("next_cursor")
+
+        if not cursor:
+            break
+
+
+def iter_store_data(api_url: str, payload: dict, page_size: int = DEFAULT_PAGE_SIZE, on_page=None,
+                    wire_format: str = "auto", compact: bool = True, stats: dict | None = None):
+    """
+    Yield the non-empty typed chunks of ``/store_data`` one at a time.
+
+    The streaming counterpart of ``load_store_data`` for callers that fold
+    the rows as they arrive (``transfer_engine.aggregate_chunks``) instead of
+    holding all of them: no cache, no sharding, no final concat.
+    ``on_page``, ``compact`` and ``stats`` work as in ``load_store_data``.
+    """
+    rows_loaded = 0
+    total_rows = None
+
+    for chunk, page_total in iter_store_data_pages(api_url, payload, page_size=page_size,
+                                                     wire_format=wire_format):
+        if page_total is not None:
+            total_rows = page_total
+        if not chunk.empty:
+            if compact:
+                chunk = compact_store_frame(chunk, stats)
+            rows_loaded += len(chunk)
+        if on_page is not None:
+            on_page(rows_loaded, total_rows)
+        if not chunk.empty:
+            yield chunk
+
+
+def _collect_pages(api_url: str, payload: dict, page_size: int, wire_format: str, on_page=None,
+                   compact: bool = True, stats: dict | None = None) -> pd.DataFrame:
+    chunks = list(iter_store_data(api_url, payload, page_size, on_page=on_page, wire_format=wire_format,
+                                  compact=compact, stats=stats))
+    if not chunks:
+        return pd.DataFrame()
+    return concat_store_frames(chunks)
+
+
+def split_shards(payload: dict, shard_by) -> dict:
+    """
+    Split a payload into one payload per combination of the ``shard_by`` values.
+
+    Only filters with more than one selected value are split. Returns
+    ``{((col, value), ...): payload}``, or an empty dict when nothing splits.
+    """
+    axes = []
+    for col in shard_by or ():
+        value = payload.get(col)
+        if isinstance(value, (list, tuple)):
+            values = [v for v in value if v not in (None, "", "All")]
+            if len(values) > 1:
+                axes.append([(col, v) for v in values])
+    if not axes:
+        return {}
+
+    # The prefilter judges a SKU on all of its rows, so each shard tells the
+    # server the full filter scope to evaluate it over.
+    prefilter = payload.get("prefilter")
+    if prefilter:
+        prefilter = dict(prefilter, scope={col: payload.get(col) for col in shard_by})
+
+    shards = {}
+    for combo in itertools.product(*axes):
+        shard = dict(payload)
+        for col, value in combo:
+            shard[col] = [value]
+        if prefilter:
+            shard["prefilter"] = prefilter
+        shards[combo] = shard
+    return shards
+
+
+def _collect_shards(api_url: str, shards: dict, page_size: int, wire_format: str, on_page=None,
+                    max_workers: int = DEFAULT_MAX_WORKERS, deadline: float | None = None,
+                    compact: bool = True, stats: dict | None = None) -> pd.DataFrame:
+    # Each shard fills its own stats dict; they are summed once all are back
+    shard_stats = {key: {} for key in shards}
+    calls = {
+        key: (lambda key=key, shard=shard: _collect_pages(api_url, shard, page_size, wire_format,
+                                                          compact=compact, stats=shard_stats[key]))
+        for key, shard in shards.items()
+    }
+    rows_loaded = 0
+
+    def _on_shard(key, df):
+        nonlocal rows_loaded
+        rows_loaded += len(df)
+        if on_page is not None:
+            on_page(rows_loaded, None)
+
+    result = fan_out(calls, max_workers=max_workers, deadline=deadline, on_result=_on_shard)
+    frames = [df for df in result.results.values() if not df.empty]
+    df = concat_store_frames(frames) if frames else pd.DataFrame()
+
+    if stats is not None:
+        for key in result.results:
+            for name, value in shard_stats[key].items():
+                stats[name] = stats.get(name, 0) + value
+
+    if not result.ok:
+        raise ShardFetchError(df, result.errors)
+    return df
+
+
+def load_store_data(api_url: str, payload: dict, page_size: int = DEFAULT_PAGE_SIZE, on_page=None,
+                    wire_format: str = "auto", cache=None, refresh: bool = False, shard_by=None,
+                    max_workers: int = DEFAULT_MAX_WORKERS, deadline: float | None = None,
+                    compact: bool = True, stats: dict | None = None) -> pd.DataFrame:
+    """
+    Stream ``/store_data`` page by page and concatenate the typed chunks once.
+
+    ``on_page(rows_loaded, total_rows)`` is called after every page; the
+    first call can be used to size a progress indicator.
+
+    With a ``result_cache.ResultCache`` the result is keyed by user and
+    filter set and served from disk on repeat runs; ``refresh=True`` skips
+    the lookup and overwrites the entry.
+
+    ``shard_by`` names multi-select filters (e.g. ``("Years", "Season")``)
+    whose values are fetched as separate requests on up to ``max_workers``
+    threads and concatenated. If any shard fails, ``ShardFetchError`` is
+    raised with the shards that did load.
+
+    ``compact=True`` applies ``compact_store_frame`` to every chunk as it
+    arrives; pass a ``stats`` dict to get the before/after memory footprint.
+    """
+    cache_key = None
+    if cache is not None:
+        filters = {k: v for k, v in payload.items() if k != "user_id"}
+        cache_key = cache.make_key(payload.get("user_id"), "/store_data", filters)
+        if not refresh:
+            df = cache.get(cache_key)
+            if df is not None:
+                if stats is not None:
+                    stats["after_bytes"] = frame_memory(df)
+                if on_page is not None:
+                    on_page(len(df), len(df))
+                return df
+
+    shards = split_shards(payload, shard_by)
+    if shards:
+        df = _collect_shards(api_url, shards, page_size, wire_format, on_page=on_page,
+                             max_workers=max_workers, deadline=deadline, compact=compact, stats=stats)
+    else:
+        df = _collect_pages(api_url, payload, page_size, wire_format, on_page=on_page,
+                            compact=compact, stats=stats)
+
+    aggregate = payload.get("aggregate")
+    if df.empty:
+        df = empty_store_frame(payload, compact)
+    elif aggregate and "Adjusted_first_Rcv_Date" in df.columns:
+        df = combine_aggregated(df, aggregate.get("partition"))
+
+    if stats is not None and compact:
+        # Categories are shared after the final concat, so measure the result itself
+        stats["after_bytes"] = frame_memory(df)
+    if cache_key is not None and not df.empty:
+        cache.put(cache_key, df)
+    return df
+
+
+_filter_options = {}
+_filter_options_lock = threading.Lock()
+
+# API URLs whose /unique_values only takes one ``column`` per request
+_unbatched_urls = set()
+
+
+def _fetch_column_values(api_url: str, user_id, column: str) -> list:
+    resp = get_client().post(f"{api_url}/unique_values", json={"user_id": user_id, "column": column})
+    resp.raise_for_status()
+    result = resp.json()
+    if not result.get("success"):
+        raise StoreDataError(result.get("error", "Unknown error"))
+    return result.get("values", [])
+
+
+def fetch_filter_options(api_url: str, user_id, columns: list, max_workers: int = DEFAULT_MAX_WORKERS,
+                         deadline: float | None = None) -> FanOutResult:
+    """
+    Ask ``/unique_values`` for the option lists of every column in one request.
+
+    The batched form sends ``columns`` and expects ``values`` keyed by column.
+    If the batched request fails for any reason, the columns are asked one
+    per request, concurrently. ``api_url`` is remembered as unbatched, and
+    later calls go straight to single requests, only when the reply showed
+    the server does not take ``columns`` (an HTTP 4xx, or ``values`` that is
+    not keyed by column) and every single request then succeeded: a bad
+    column or a server error does not turn batching off. The result holds
+    the columns that loaded and an error for each that did not.
+    """
+    with _filter_options_lock:
+        batched = api_url not in _unbatched_urls
+    unsupported = False
+    if batched:
+        resp = get_client().post(f"{api_url}/unique_values", json={"user_id": user_id, "columns": list(columns)})
+        try:
+            resp.raise_for_status()
+            result = resp.json()
+        except requests.HTTPError:
+            unsupported = 400 <= resp.status_code < 500
+            result = {}
+
+        values = result.get("values")
+        if result.get("success") and isinstance(values, dict):
+            return FanOutResult({col: values.get(col, []) for col in columns}, {})
+        unsupported = unsupported or (values is not None and not isinstance(values, dict))
+
+    calls = {col: (lambda col=col: _fetch_column_values(api_url, user_id, col)) for col in columns}
+    fetched = fan_out(calls, max_workers=max_workers, deadline=deadline)
+    if unsupported and not fetched.errors:
+        # 🔹 The single-column form works where the batched one did not: skip the batched request from now on
+        with _filter_options_lock:
+            _unbatched_urls.add(api_url)
+    return fetched
+
+
+def get_filter_options(api_url: str, user_id, columns: list, ttl: float = FILTER_OPTIONS_TTL,
+                       deadline: float | None = 20) -> FanOutResult:
+    """
+    Return the option lists for the filter row, memoized per user for ``ttl`` seconds.
+
+    Only columns missing from the memo (or expired) are requested, and they
+    are requested together. Columns that failed to load are left out of
+    ``results`` and reported in ``errors``; they are not memoized.
+    """
+    now = time.monotonic()
+    options = {}
+    missing = []
+    with _filter_options_lock:
+        for col in columns:
+            entry = _filter_options.get((api_url, user_id, col))
+            if entry is not None and entry[0] > now:
+                options[col] = entry[1]
+            else:
+                missing.append(col)
+
+    errors = {}
+    if missing:
+        fetched = fetch_filter_options(api_url, user_id, missing, deadline=deadline)
+        with _filter_options_lock:
+            for col, values in fetched.results.items():
+                _filter_options[(api_url, user_id, col)] = (now + ttl, values)
+        options.update(fetched.results)
+        errors = fetched.errors
+
+    return FanOutResult({col: options[col] for col in columns if col in options}, errors)
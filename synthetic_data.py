@@ -0,0 +1,147 @@
+# synthetic_data.py — deterministic store data for the local API and benchmarks
+import numpy as np
+import pandas as pd
+
+CITIES = ["Lahore", "Karachi", "Islamabad", "Multan", "Faisalabad", "Peshawar"]
+CITY_ZONES = {
+    "Lahore": "North",
+    "Islamabad": "North",
+    "Peshawar": "North",
+    "Faisalabad": "Central",
+    "Multan": "Central",
+    "Karachi": "South",
+}
+VOLUMES = ["Casual", "Fancy", "Premium"]
+PRODUCT_TYPES = ["Lawn", "Chiffon", "Khaddar", "Cotton"]
+SEASONS = ["Summer", "Winter", "Eid"]
+SIZES = ["Small", "Medium", "Large", "XL"]
+COLORS = ["Red", "Blue", "Green", "Black", "White"]
+
+
+def make_store_data(n_rows: int, seed: int = 0, n_stores: int = 60, n_designs: int = 2_000) -> pd.DataFrame:
+    """
+    Return ``n_rows`` of store data in the schema ``/store_data`` serves.
+
+    The same ``(n_rows, seed, n_stores, n_designs)`` always produces the same
+    frame, so benchmark runs are comparable.
+    """
+    rng = np.random.default_rng(seed)
+
+    store_ids = rng.integers(0, n_stores, n_rows)
+    store_city = np.array([CITIES[i % len(CITIES)] for i in range(n_stores)])
+    design_ids = rng.integers(0, n_designs, n_rows)
+    size_ids = rng.integers(0, len(SIZES), n_rows)
+    color_ids = rng.integers(0, len(COLORS), n_rows)
+
+    # One SKU per design/size/color combination
+    sku = 1_000_000 + (design_ids * len(SIZES) + size_ids) * len(COLORS) + color_ids
+
+    received = rng.integers(5, 120, n_rows)
+    dispatched = (received * rng.uniform(0, 0.2, n_rows)).astype(np.int64)
+    sold = (received - dispatched) * rng.uniform(0, 1, n_rows)
+    sold = sold.astype(np.int64)
+    on_hand = received - dispatched - sold
+
+    first_rcv = np.datetime64("2023-01-01") + rng.integers(0, 900, n_rows).astype("timedelta64[D]")
+    city = store_city[store_ids]
+
+    return pd.DataFrame({
+        "DESIGN": np.array([f"D{i:05d}" for i in range(n_designs)], dtype=object)[design_ids],
+        "STORE_NAME": np.array([f"Store{i:03d}" for i in range(n_stores)], dtype=object)[store_ids],
+        "first_rcv_date": first_rcv.astype("datetime64[ns]"),
+        "UPC_Barcode_SKU": sku,
+        "Shop_Rcv_Qty": received,
+        "Disp_Qty": dispatched,
+        "OH_Qty": on_hand,
+        "Sold_Qty": sold,
+        "Color": np.array(COLORS)[color_ids],
+        "Size": np.array(SIZES)[size_ids],
+        "Volume": np.array(VOLUMES)[design_ids % len(VOLUMES)],
+        "product_type": np.array(PRODUCT_TYPES)[design_ids % len(PRODUCT_TYPES)],
+        "Season": np.array(SEASONS)[design_ids % len(SEASONS)],
+        "Years": first_rcv.astype("datetime64[Y]").astype(int) + 1970,
+        "City": city,
+        "Zone": np.array([CITY_ZONES[c] for c in store_city], dtype=object)[store_ids],
+    })
+
+
+def _categorical(names, codes: np.ndarray) -> pd.Categorical:
+    # Sorted categories, as compact_store_frame's astype("category") gives them
+    names = np.asarray(names, dtype=object)
+    order = np.argsort(names, kind="stable")
+    rank = np.empty(len(names), dtype=np.int32)
+    rank[order] = np.arange(len(names), dtype=np.int32)
+    return pd.Categorical.from_codes(rank[codes], names[order])
+
+
+def _labels(base: list, n: int, prefix: str) -> list:
+    return base[:n] if n <= len(base) else base + [f"{prefix}{i}" for i in range(len(base), n)]
+
+
+def make_store_grid(n_rows: int, n_stores: int = 60, n_designs: int = 2_000, n_sizes: int = 4, n_colors: int = 5,
+                    skew: float = 1.2, seed: int = 0) -> pd.DataFrame:
+    """
+    Return ``n_rows`` receipts over a ``n_stores`` x (``n_designs`` x ``n_sizes`` x ``n_colors`` SKUs) grid.
+
+    Closer to production than ``make_store_data``: stores sit in cities
+    (bigger cities have more of them) and carry their city's zone, store
+    traffic is lognormal, middle sizes sell best, and design appeal follows
+    a power law of exponent ``skew``, which drives both how widely a design
+    is stocked and its sell-through. Each design launches on one date and
+    its receipts follow within six weeks, so a (SKU, store) pair may have
+    several rows. Columns are those of the pages' sample file plus
+    ``Season``, ``Years``, ``City`` and ``Zone``; dimensions come as
+    categoricals and quantities as int32, the way the loaders hand them over
+    after ``compact_store_frame``. Deterministic for the same arguments.
+    """
+    rng = np.random.default_rng(seed)
+    sizes, colors = _labels(SIZES, n_sizes, "Size"), _labels(COLORS, n_colors, "Color")
+
+    city_weight = 1 / np.arange(1, len(CITIES) + 1)
+    store_city = rng.choice(len(CITIES), n_stores, p=city_weight / city_weight.sum())
+    store_traffic = rng.lognormal(0, 0.5, n_stores)
+
+    # Appeal 1 for the best design down to ~0 for the worst
+    appeal = (1 - rng.permutation(n_designs) / n_designs) ** skew
+    size_weight = np.exp(-((np.arange(n_sizes) - (n_sizes - 1) / 2) / max(n_sizes / 3, 1)) ** 2)
+    color_weight = rng.dirichlet(np.full(n_colors, 2.0))
+
+    def draw(weight: np.ndarray) -> np.ndarray:
+        return rng.choice(len(weight), n_rows, p=weight / weight.sum()).astype(np.int32)
+
+    store_ids = draw(store_traffic)
+    design_ids = draw(0.1 + appeal)
+    size_ids = draw(size_weight)
+    color_ids = draw(color_weight)
+    sku = 1_000_000 + (design_ids.astype(np.int64) * n_sizes + size_ids) * n_colors + color_ids
+
+    received = rng.poisson(12 * store_traffic[store_ids]).astype(np.int32) + 1
+    dispatched = (received * rng.uniform(0, 0.15, n_rows)).astype(np.int32)
+    mean_rate = np.clip((0.05 + 0.85 * appeal[design_ids]) * store_traffic[store_ids] ** 0.5, 0.01, 0.99)
+    rate = rng.beta(4 * mean_rate, 4 * (1 - mean_rate))
+    sold = ((received - dispatched) * rate).astype(np.int32)
+    on_hand = received - dispatched - sold
+
+    launch = np.datetime64("2023-01-01") + rng.integers(0, 900, n_designs).astype("timedelta64[D]")
+    first_rcv = launch[design_ids] + rng.integers(0, 42, n_rows).astype("timedelta64[D]")
+    zones = sorted(set(CITY_ZONES.values()))
+    city_zone = np.array([zones.index(CITY_ZONES[c]) for c in CITIES], dtype=np.int32)
+
+    return pd.DataFrame({
+        "DESIGN": _categorical([f"D{i:05d}" for i in range(n_designs)], design_ids),
+        "STORE_NAME": _categorical([f"Store{i:03d}" for i in range(n_stores)], store_ids),
+        "first_rcv_date": first_rcv.astype("datetime64[ns]"),
+        "UPC_Barcode_SKU": sku,
+        "Shop_Rcv_Qty": received,
+        "Disp_Qty": dispatched,
+        "OH_Qty": on_hand,
+        "Sold_Qty": sold,
+        "Color": _categorical(colors, color_ids),
+        "Size": _categorical(sizes, size_ids),
+        "Volume": _categorical(VOLUMES, design_ids % len(VOLUMES)),
+        "product_type": _categorical(PRODUCT_TYPES, design_ids % len(PRODUCT_TYPES)),
+        "Season": _categorical(SEASONS, design_ids % len(SEASONS)),
+        "Years": first_rcv.astype("datetime64[Y]").astype(np.int32) + 1970,
+        "City": _categorical(CITIES, store_city[store_ids]),
+        "Zone": _categorical(zones, city_zone[store_city[store_ids]]),
+    })
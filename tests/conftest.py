@@ -0,0 +1,32 @@
+"""Shared fixtures: synthetic store data and local_api.py serving it over HTTP on a free port."""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+STORE_ROWS = 4_000
+
+
+@pytest.fixture(scope="session")
+def store_data():
+    from synthetic_data import make_store_data
+
+    return make_store_data(STORE_ROWS, seed=3)
+
+
+@pytest.fixture(scope="session")
+def local_api_url(store_data):
+    from werkzeug.serving import make_server
+
+    import local_api
+
+    local_api._STORE_DATA = store_data
+    server = make_server("127.0.0.1", 0, local_api.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    thread.join()
@@ -0,0 +1,83 @@
+"""
+db_loader: the SQLite stand-in for dbo.Product_Data loads what local_api.py
+serves over HTTP for the same payload, and every pooled connection ends up
+either back in the pool or closed.
+"""
+import pandas as pd
+import pytest
+
+from db_loader import ConnectionPool, connect_sqlite, load_store_data_db, mssql_connection_string, write_sqlite_stand_in
+from store_api import load_store_data, make_aggregate, make_prefilter
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def rows(pool: ConnectionPool):
+    with pool.connection() as conn:
+        yield conn
+        yield conn
+
+
+def test_returned_after_use():
+    pool = ConnectionPool(FakeConnection, size=1)
+    with pool.connection() as conn:
+        pass
+    assert not conn.closed
+    assert pool._idle == [conn]
+
+
+def test_closed_after_error():
+    pool = ConnectionPool(FakeConnection, size=1)
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            raise RuntimeError("query failed")
+    assert conn.closed
+    assert pool._idle == []
+
+
+def test_closed_when_generator_is_dropped_mid_read():
+    pool = ConnectionPool(FakeConnection, size=1)
+    gen = rows(pool)
+    conn = next(gen)
+    gen.close()
+    assert conn.closed
+    assert pool._idle == []
+
+
+@pytest.fixture(scope="module")
+def sqlite_pool(store_data, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("db") / "product_data.db")
+    write_sqlite_stand_in(path, store_data)
+    pool = ConnectionPool(lambda: connect_sqlite(path))
+    yield pool
+    pool.close_all()
+
+
+@pytest.mark.parametrize("aggregate", [False, True], ids=["rows", "aggregate"])
+@pytest.mark.parametrize("prefilter", [False, True], ids=["all", "prefilter"])
+@pytest.mark.parametrize("partition", [None, "City", "Zone"])
+def test_sqlite_matches_http(local_api_url, sqlite_pool, partition, prefilter, aggregate):
+    payload = {"user_id": 1, "Season": ["Summer", "Eid"]}
+    if prefilter:
+        payload["prefilter"] = make_prefilter("2024-01-01", 40, 100, partition=partition, as_of="2025-09-01")
+    if aggregate:
+        payload["aggregate"] = make_aggregate("2024-01-01", partition=partition)
+    expected = load_store_data(local_api_url, payload)
+    result = load_store_data_db(payload, pool=sqlite_pool)
+    assert len(result) > 0
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False)
+
+
+def test_mssql_connection_string():
+    cfg = {"server": "db.example", "port": 19285, "database": "Planning", "username": "u", "password": "p"}
+    conn_str = mssql_connection_string(cfg)
+    assert "DRIVER={ODBC Driver 18 for SQL Server};" in conn_str
+    assert "SERVER=db.example,19285;" in conn_str
+    assert "SERVER=db.example;" in mssql_connection_string(dict(cfg, port=None))
+    assert "DRIVER={FreeTDS};" in mssql_connection_string(dict(cfg, driver="FreeTDS"))
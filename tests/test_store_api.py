@@ -0,0 +1,80 @@
+"""store_api against local_api.py: filter options and /store_data loads."""
+import pandas as pd
+import requests
+
+import store_api
+from store_api import QUANTITY_COLUMNS, fetch_filter_options, load_store_data, make_aggregate
+
+
+class Reply:
+    def __init__(self, status_code: int, body: dict):
+        self.status_code = status_code
+        self.body = body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+    def json(self):
+        return self.body
+
+
+class SingleColumnServer:
+    """A /unique_values that only takes ``column``: the batched form is a 400."""
+
+    def __init__(self):
+        self.requests = []
+
+    def post(self, url, json=None):
+        self.requests.append(json)
+        if "columns" in json:
+            return Reply(400, {"success": False, "error": "column is required"})
+        return Reply(200, {"success": True, "values": [f"{json['column']} 1"]})
+
+
+class DownServer:
+    def post(self, url, json=None):
+        return Reply(503, {})
+
+
+def test_bad_column_keeps_batching(local_api_url):
+    store_api._unbatched_urls.discard(local_api_url)
+    result = fetch_filter_options(local_api_url, 1, ["Volume", "Seasons"])
+    assert list(result.results) == ["Volume"] and list(result.errors) == ["Seasons"]
+    assert local_api_url not in store_api._unbatched_urls
+
+    result = fetch_filter_options(local_api_url, 1, ["Volume", "Season"])
+    assert set(result.results) == {"Volume", "Season"} and not result.errors
+
+
+def test_single_column_server_is_remembered(monkeypatch):
+    server = SingleColumnServer()
+    monkeypatch.setattr(store_api, "get_client", lambda: server)
+    url = "http://single-column.test"
+    store_api._unbatched_urls.discard(url)
+
+    assert fetch_filter_options(url, 1, ["Volume", "Season"]).results == {"Volume": ["Volume 1"],
+                                                                         "Season": ["Season 1"]}
+    assert url in store_api._unbatched_urls
+    server.requests.clear()
+    fetch_filter_options(url, 1, ["Volume"])
+    assert server.requests == [{"user_id": 1, "column": "Volume"}]
+
+
+def test_server_error_keeps_batching(monkeypatch):
+    monkeypatch.setattr(store_api, "get_client", DownServer)
+    url = "http://down.test"
+    store_api._unbatched_urls.discard(url)
+    assert fetch_filter_options(url, 1, ["Volume"]).errors
+    assert url not in store_api._unbatched_urls
+
+
+def test_sharded_aggregate_matches_unsharded(local_api_url):
+    """Groups that span Years shards (the launch-date clamp merges them) are summed again, in the same columns."""
+    payload = {"user_id": 1, "Years": [2023, 2024, 2025], "Season": ["Summer", "Winter"],
+               "aggregate": make_aggregate("2026-01-01", partition="City")}
+    whole = load_store_data(local_api_url, payload)
+    sharded = load_store_data(local_api_url, payload, shard_by=("Years", "Season"))
+    assert list(sharded.columns) == list(whole.columns)
+    assert list(whole.columns[-len(QUANTITY_COLUMNS):]) == QUANTITY_COLUMNS
+    pd.testing.assert_frame_equal(sharded, whole, check_dtype=False, check_categorical=False)
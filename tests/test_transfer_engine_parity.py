@@ -0,0 +1,104 @@
+"""
+transfer_engine.run_pipeline against the pre-engine page code in
+benchmarks/legacy/, for the Network, City and Zone partitions.
+
+    python -m pytest tests
+
+The inputs are small: synthetic store data through the loader's normalize
+and compact steps, the same with missing receive dates, and a dense grid of
+a few SKUs in every store, where most senders have several receivers to
+split between.
+"""
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bench_transfer_engine import assert_same_result, run_legacy  # noqa: E402
+from stage_cache import StageCache  # noqa: E402
+from store_api import compact_store_frame, normalize_store_frame  # noqa: E402
+from synthetic_data import make_store_data  # noqa: E402
+from transfer_engine import PARTITIONS, run_pipeline  # noqa: E402
+
+THRESHOLD_DATE = "2023-06-01"
+THRESHOLDS = [(THRESHOLD_DATE, 60, 30), (THRESHOLD_DATE, 20, 10)]
+
+
+def synthetic(rows: int = 5_000) -> pd.DataFrame:
+    return compact_store_frame(normalize_store_frame(make_store_data(rows, seed=1)))
+
+
+def nat_dates() -> pd.DataFrame:
+    """Synthetic rows with one in eight receive dates missing."""
+    df = synthetic()
+    df.loc[df.index % 8 == 3, "first_rcv_date"] = pd.NaT
+    return df
+
+
+def dense(n_skus: int = 4, n_stores: int = 40) -> pd.DataFrame:
+    """Every SKU in every store of two cities in two zones, with quantities that make many senders and receivers."""
+    rng = np.random.default_rng(7)
+    stores = [f"Store{i:03d}" for i in range(n_stores)]
+    cities = ["Lahore" if i % 2 else "Multan" for i in range(n_stores)]
+    zones = ["North" if i % 4 < 2 else "South" for i in range(n_stores)]
+    rows = []
+    for sku in range(n_skus):
+        for store, city, zone in zip(stores, cities, zones):
+            received = int(rng.integers(20, 60))
+            rows.append({
+                "DESIGN": f"Design{sku}", "STORE_NAME": store,
+                "first_rcv_date": datetime(2023, 1 + sku, 1 + int(rng.integers(0, 27))),
+                "UPC_Barcode_SKU": 100_000 + sku, "Shop_Rcv_Qty": received, "Disp_Qty": int(rng.integers(0, 3)),
+                "OH_Qty": int(rng.integers(0, received)), "Sold_Qty": int(rng.integers(0, received)),
+                "Color": "Red", "Size": "M", "Volume": "Casual", "product_type": "Lawn",
+                "City": city, "Zone": zone,
+            })
+    return compact_store_frame(normalize_store_frame(pd.DataFrame(rows)))
+
+
+DATASETS = {"synthetic": synthetic, "nat_dates": nat_dates, "dense": dense}
+
+
+@pytest.fixture(scope="module", params=list(DATASETS))
+def data(request):
+    return DATASETS[request.param]()
+
+
+@pytest.mark.parametrize("thresholds", THRESHOLDS, ids=lambda t: f"st{t[1]}-days{t[2]}")
+@pytest.mark.parametrize("mode", list(PARTITIONS))
+def test_matches_legacy(data, mode, thresholds):
+    now = datetime.now()
+    result = run_pipeline(data, *thresholds, partition=PARTITIONS[mode], now=now)
+    expected = run_legacy(mode, data.copy(), *thresholds)
+    assert_same_result(expected, result)
+
+
+@pytest.mark.parametrize("mode", list(PARTITIONS))
+def test_dense_grid_transfers(mode):
+    """The dense grid does produce transfers, with receivers shared between senders."""
+    data = dense()
+    _, transfers = run_pipeline(data, THRESHOLD_DATE, 20, 10, partition=PARTITIONS[mode])
+    assert len(transfers) > 0
+    assert transfers.duplicated(["UPC_Barcode_SKU", "To Store"]).any()
+    assert transfers["Quantity Transferred"].gt(0).all()
+
+
+def test_parallel_reuses_sku_columns():
+    """With the worker pool on, a threshold change reuses the per-SKU columns and matches a serial run."""
+    data = synthetic()
+    cache, now = StageCache(), datetime.now()
+    run_pipeline(data, *THRESHOLDS[0], partition="City", now=now, workers=2, parallel_min_rows=0, cache=cache)
+    stages = {}
+    result = run_pipeline(data, *THRESHOLDS[1], partition="City", now=now, workers=2, parallel_min_rows=0,
+                          cache=cache, stages=stages)
+    assert stages == {"aggregate": "hit", "sku_columns": "hit", "filter": "run", "transfers": "run"}
+    expected = run_pipeline(data, *THRESHOLDS[1], partition="City", now=now)
+    pd.testing.assert_frame_equal(result[0], expected[0])
+    pd.testing.assert_frame_equal(result[1], expected[1])
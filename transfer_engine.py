@@ -0,0 +1,624 @@
+# transfer_engine.py — the stock-transfer pipeline shared by the Network, City and Regional pages
+#
+# The pages differ only in the partition key: Network balances stock across the
+# whole network, City and Regional only between stores of the same City / Zone.
+# Columns use the names the loaders return (see store_api.normalize_store_frame).
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from stage_cache import StageCache, StageRunner, fingerprint
+from stage_profile import StageProfile, profiled
+from store_api import QUANTITY_COLUMNS, aggregate_keys, concat_store_frames, frame_memory
+
+# Page name -> partition column
+PARTITIONS = {"Network": None, "City": "City", "Zone": "Zone"}
+
+# Columns copied from the sending row into each transfer line
+TRANSFER_COLUMNS = ["DESIGN", "Size", "Color", "Volume", "product_type"]
+
+# Aggregated rows from which run_pipeline(workers > 1) uses the process pool. None: never, unless the caller
+# passes ``parallel_min_rows``. Shipping partitions to spawned workers cost more than it saved in
+# bench_transfer_engine.py (2M rows: 9.4 s against 3.7 s in-process), so there is no measured break-even to default to.
+PARALLEL_MIN_ROWS = None
+
+
+class PipelineError(ValueError):
+    """The input frame is missing a column the pipeline needs."""
+
+
+class MemoryBudgetError(RuntimeError):
+    """Chunked aggregation needs more memory than its ``max_bytes`` budget."""
+
+
+def sku_keys(partition: str | None = None) -> list:
+    """Grouping key for per-SKU figures: the SKU, within its City/Zone when partitioned."""
+    return ["UPC_Barcode_SKU"] + ([partition] if partition else [])
+
+
+def _require(df: pd.DataFrame, columns: list):
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise PipelineError(f"Missing column(s): {', '.join(missing)}")
+
+
+# Stage function name -> (columns it reads, columns it adds or replaces), besides the SKU/partition keys
+STAGE_COLUMNS = {}
+
+
+def stage(reads: list, writes: list):
+    """
+    Declare the columns a stage function reads and writes, and run it copy-on-write.
+
+    The function gets a shallow copy of its input and only assigns whole
+    columns, so the caller's frame (which may sit in the stage cache) is
+    never modified; the same guarantee as pandas' copy-on-write mode, on any
+    pandas version. Missing ``reads`` raise ``PipelineError``.
+    """
+    def decorate(fn):
+        STAGE_COLUMNS[fn.__name__] = (list(reads), list(writes))
+
+        @functools.wraps(fn)
+        def run(df: pd.DataFrame, *args, **kwargs):
+            _require(df, reads)
+            return fn(df.copy(deep=False), *args, **kwargs)
+        return run
+    return decorate
+
+
+def stage_reads() -> set:
+    """Every column some declared stage reads."""
+    return {c for reads, _ in STAGE_COLUMNS.values() for c in reads}
+
+
+# ---------- STAGES ----------
+@stage(reads=["first_rcv_date"], writes=["first_rcv_date", "Adjusted_first_Rcv_Date"])
+def adjust_date(df: pd.DataFrame, threshold_date) -> pd.DataFrame:
+    """Add ``Adjusted_first_Rcv_Date``: ``first_rcv_date`` clamped up to the launch date (NaT stays NaT)."""
+    df["first_rcv_date"] = pd.to_datetime(df["first_rcv_date"], errors="coerce")
+    df["Adjusted_first_Rcv_Date"] = df["first_rcv_date"].clip(lower=pd.Timestamp(threshold_date))
+    return df
+
+
+def aggregate_data(df: pd.DataFrame, threshold_date, partition: str | None = None) -> pd.DataFrame:
+    """
+    Sum the quantities per ``store_api.aggregate_keys(partition)``.
+
+    Frames the server already aggregated (``aggregate`` push-down) carry
+    ``Adjusted_first_Rcv_Date`` instead of ``first_rcv_date`` and are
+    returned as they are.
+    """
+    if "first_rcv_date" not in df.columns and "Adjusted_first_Rcv_Date" in df.columns:
+        return df
+    keys = aggregate_keys(partition)
+    df = adjust_date(df, threshold_date)
+    _require(df, keys + QUANTITY_COLUMNS)
+    return df.groupby(keys, observed=True)[QUANTITY_COLUMNS].sum().reset_index()
+
+
+@stage(reads=["Sold_Qty", "Shop_Rcv_Qty", "Disp_Qty"], writes=["shop Sell Through"])
+def calculate_sell_through(df: pd.DataFrame) -> pd.DataFrame:
+    sell_through = (df["Sold_Qty"] / (df["Shop_Rcv_Qty"] - df["Disp_Qty"]) * 100).replace([np.inf, -np.inf, np.nan], 0)
+    df["shop Sell Through"] = sell_through.astype(int)
+    return df
+
+
+@stage(reads=["Adjusted_first_Rcv_Date"], writes=["Shop Days"])
+def calculate_days(df: pd.DataFrame, now: datetime | None = None) -> pd.DataFrame:
+    df["Shop Days"] = ((now or datetime.now()) - df["Adjusted_first_Rcv_Date"]).dt.days
+    return df
+
+
+@stage(reads=["shop Sell Through", "design Sell Through"], writes=["Status"])
+def apply_status_condition(df: pd.DataFrame, partition: str | None = None) -> pd.DataFrame:
+    """
+    Mark rows selling faster than their SKU as ``High``.
+
+    Network has always counted a tie as ``High``; City and Regional count it
+    as ``Low``.
+    """
+    shop, design = df["shop Sell Through"], df["design Sell Through"]
+    high = shop >= design if partition is None else shop > design
+    # A two-value categorical: the labels are only spelled out on export
+    df["Status"] = pd.Categorical.from_codes(np.where(high, 0, 1).astype(np.int8), ["High", "Low"])
+    return df
+
+
+@stage(reads=["Targeted Cover", "Sold_Qty", "Shop Days", "OH_Qty"], writes=["Transfer in/out"])
+def calculate_required_cover(df: pd.DataFrame) -> pd.DataFrame:
+    """Add ``Transfer in/out``: stock needed to hold ``Targeted Cover`` at the row's own sales rate, minus on-hand."""
+    transfer = df["Targeted Cover"] * (df["Sold_Qty"] / df["Shop Days"]) - df["OH_Qty"]
+    df["Transfer in/out"] = transfer.replace([np.inf, -np.inf, np.nan], 0).astype(int)
+    return df
+
+
+# ---------- KEY CODES ----------
+def key_codes(values: pd.Series) -> np.ndarray:
+    """
+    Integer code per row, -1 where missing.
+
+    The loaders' compact schema already stores keys as categoricals, i.e.
+    integer codes plus a dictionary of names, so their codes are used as
+    they are and no name is hashed again; other columns are factorized.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy()
+    return pd.factorize(values)[0]
+
+
+def sku_codes(df: pd.DataFrame, partition: str | None = None) -> np.ndarray:
+    """int32 code per row for its SKU, within its City/Zone when partitioned; -1 where a key is missing."""
+    codes = key_codes(df["UPC_Barcode_SKU"]).astype(np.int64)
+    if partition:
+        part = key_codes(df[partition]).astype(np.int64)
+        valid = (codes >= 0) & (part >= 0)
+        combined = part * (int(codes.max(initial=0)) + 1) + codes
+        codes = np.full(len(df), -1, dtype=np.int64)
+        codes[valid] = pd.factorize(combined[valid])[0]
+    return codes.astype(np.int32)
+
+
+def _segments(codes: np.ndarray) -> tuple:
+    """``(order, starts)``: rows grouped by code, and where each code's run begins."""
+    # Aggregated frames come sorted by their keys, so the codes usually already run in order
+    order = np.flatnonzero(codes >= 0)
+    if np.any(codes[order][1:] < codes[order][:-1]):
+        order = order[np.argsort(codes[order], kind="stable")]
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(order) else order
+    return order, starts
+
+
+def sku_figures(df: pd.DataFrame, partition: str | None = None) -> tuple:
+    """
+    Return ``(per_sku, row_sku)``: one row of SKU totals per code, and each row's code.
+
+    ``per_sku`` holds the summed ``Sold_Qty``, ``Net Receiving`` and
+    ``OH_Qty``, the oldest ``Shop Days`` and the earliest
+    ``Adjusted_first_Rcv_Date`` of each SKU (per City/Zone when
+    partitioned); ``per_sku.iloc[row_sku]`` lines them up with ``df``.
+    Sums are ``np.bincount`` over ``sku_codes`` and the oldest/earliest
+    values ``reduceat`` over the rows grouped by code, so no key is hashed.
+    """
+    row_sku = sku_codes(df, partition)
+    n = int(row_sku.max(initial=-1)) + 1
+    valid = row_sku >= 0
+    order, starts = _segments(row_sku)
+    present = row_sku[order[starts]]
+
+    def total(column):
+        values = df[column].to_numpy(dtype=np.float64, na_value=0)
+        return np.bincount(row_sku[valid], weights=values[valid], minlength=n)
+
+    shop_days = np.full(n, np.nan)
+    if len(starts):
+        days = df["Shop Days"].to_numpy(dtype=np.float64, na_value=np.nan)
+        shop_days[present] = np.fmax.reduceat(days[order], starts)
+
+    # Earliest date: NaT is the smallest int64, so it is lifted above every date for the minimum
+    dates = df["Adjusted_first_Rcv_Date"].to_numpy()
+    ticks = dates.view(np.int64).copy()
+    nat = np.iinfo(np.int64).max
+    ticks[np.isnat(dates)] = nat
+    earliest = np.full(n, nat, dtype=np.int64)
+    if len(starts):
+        earliest[present] = np.minimum.reduceat(ticks[order], starts)
+    earliest = np.where(earliest == nat, np.iinfo(np.int64).min, earliest).view(dates.dtype)
+
+    per_sku = pd.DataFrame({
+        "Sold_Qty": total("Sold_Qty"),
+        "Net Receiving": total("Net Receiving"),
+        "OH_Qty": total("OH_Qty"),
+        "Shop Days": shop_days,
+        "Adjusted_first_Rcv_Date": earliest,
+    })
+    return per_sku, row_sku
+
+
+@stage(reads=["Shop_Rcv_Qty", "Disp_Qty", "Sold_Qty", "OH_Qty", "Shop Days", "shop Sell Through",
+               "Adjusted_first_Rcv_Date"],
+       writes=["Net Receiving", "design Sell Through", "Status", "Targeted Cover", "Transfer in/out",
+               "Max Design Days"])
+def add_sku_columns(df: pd.DataFrame, partition: str | None = None, today: pd.Timestamp | None = None) -> pd.DataFrame:
+    """
+    Add the per-SKU columns in one pass: ``Net Receiving``, ``design Sell Through``,
+    ``Status``, ``Targeted Cover``, ``Transfer in/out`` and ``Max Design Days``.
+
+    ``Targeted Cover`` is the SKU's on-hand stock over its daily sales rate
+    (total sold over its oldest ``Shop Days``); ``Max Design Days`` is the
+    age in whole days of its oldest dated row, left empty when it has none.
+    """
+    df["Net Receiving"] = df["Shop_Rcv_Qty"] - df["Disp_Qty"]
+    per_sku, row_sku = sku_figures(df, partition)
+
+    design_sell_through = (per_sku["Sold_Qty"] / per_sku["Net Receiving"] * 100).replace([np.inf, -np.inf, np.nan], 0)
+    df["design Sell Through"] = design_sell_through.astype(int).to_numpy()[row_sku]
+    df = apply_status_condition(df, partition)
+
+    cover = per_sku["OH_Qty"] / (per_sku["Sold_Qty"] / per_sku["Shop Days"])
+    df["Targeted Cover"] = cover.fillna(0).replace([np.inf, -np.inf], 0).astype(int).to_numpy()[row_sku]
+    df = calculate_required_cover(df)
+
+    today = today if today is not None else pd.Timestamp.now().normalize()
+    df["Max Design Days"] = (today - per_sku["Adjusted_first_Rcv_Date"]).dt.days.to_numpy()[row_sku]
+    return df
+
+
+@stage(reads=["design Sell Through", "Max Design Days"], writes=[])
+def filter_data(df: pd.DataFrame, sell_through_threshold, days_threshold) -> pd.DataFrame:
+    return df[(df["design Sell Through"] > sell_through_threshold) & (df["Max Design Days"] > days_threshold)]
+
+
+def _sku_stage(aggregated: pd.DataFrame, partition, now: datetime) -> pd.DataFrame:
+    df = calculate_days(calculate_sell_through(aggregated), now)
+    return add_sku_columns(df, partition, pd.Timestamp(now).normalize())
+
+
+# ---------- TRANSFER MATCHING ----------
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    # Sort-based; np.unique's hash path is several times slower on large int arrays
+    values = np.sort(values)
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:] = values[1:] != values[:-1]
+    return values[keep]
+
+
+def _match_by_intervals(group: np.ndarray, qty: np.ndarray, senders: np.ndarray, receivers: np.ndarray) -> tuple:
+    """
+    Greedy matching for groups where no store both sends and receives.
+
+    Within a group, the sequential walk hands out supply in sender order and
+    fills demand in receiver order, so sender ``i`` and receiver ``j`` trade
+    exactly the overlap of their spans on the group's cumulative-quantity
+    axis. Groups are laid end to end on one axis (each padded to the larger
+    of its supply and demand) and every span boundary is merged in one
+    sorted pass; each segment between boundaries is one transfer.
+    """
+    senders = senders[np.argsort(group[senders], kind="stable")]
+    receivers = receivers[np.argsort(group[receivers], kind="stable")]
+    s_group, r_group = group[senders], group[receivers]
+    supply, demand = -qty[senders], qty[receivers]
+
+    n_groups = int(group.max()) + 1
+    supply_total = np.bincount(s_group, weights=supply, minlength=n_groups).astype(np.int64)
+    demand_total = np.bincount(r_group, weights=demand, minlength=n_groups).astype(np.int64)
+    span = np.maximum(supply_total, demand_total)
+    base = np.cumsum(span) - span
+
+    s_end = base[s_group] + np.cumsum(supply) - (np.cumsum(supply_total) - supply_total)[s_group]
+    r_end = base[r_group] + np.cumsum(demand) - (np.cumsum(demand_total) - demand_total)[r_group]
+    s_start, r_start = s_end - supply, r_end - demand
+
+    bounds = _sorted_unique(np.concatenate([s_start, s_end, r_start, r_end]))
+    seg_start, seg_len = bounds[:-1], np.diff(bounds)
+    i = np.searchsorted(s_end, seg_start, side="right")
+    j = np.searchsorted(r_end, seg_start, side="right")
+    ok = (i < len(senders)) & (j < len(receivers))
+    i, j, seg_start, seg_len = i[ok], j[ok], seg_start[ok], seg_len[ok]
+    ok = (s_start[i] <= seg_start) & (r_start[j] <= seg_start) & (s_group[i] == r_group[j])
+    return senders[i[ok]], receivers[j[ok]], seg_len[ok]
+
+
+def _match_sequentially(group: np.ndarray, store: np.ndarray, qty: np.ndarray,
+                        senders: np.ndarray, receivers: np.ndarray) -> tuple:
+    """The greedy walk itself, for groups where a sender may have to skip its own store."""
+    qty = qty.copy()
+    by_group = {}
+    for pos in receivers:
+        by_group.setdefault(group[pos], []).append(pos)
+
+    from_rows, to_rows, amounts = [], [], []
+    for pos in senders:
+        remaining = -qty[pos]
+        for recv in by_group.get(group[pos], ()):
+            if qty[recv] <= 0 or store[recv] == store[pos]:
+                continue
+            moved = min(remaining, qty[recv])
+            qty[recv] -= moved
+            from_rows.append(pos)
+            to_rows.append(recv)
+            amounts.append(moved)
+            remaining -= moved
+            if remaining <= 0:
+                break
+    return np.asarray(from_rows, dtype=np.intp), np.asarray(to_rows, dtype=np.intp), np.asarray(amounts, dtype=np.int64)
+
+
+def match_transfers(group: np.ndarray, store: np.ndarray, qty: np.ndarray) -> tuple:
+    """
+    Return ``(from_rows, to_rows, quantities)`` as positions, in sender then receiver row order.
+
+    ``group`` numbers the SKU (and City/Zone) of each row, -1 for none;
+    ``store`` is an integer store code; ``qty`` is ``Transfer in/out``.
+    Senders are served in row order; each takes from the receivers of its
+    group in row order, skipping its own store and receivers already filled,
+    until its surplus is placed.
+    """
+    senders = np.flatnonzero((qty < 0) & (group >= 0))
+    receivers = np.flatnonzero((qty > 0) & (group >= 0))
+    if not len(senders) or not len(receivers):
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, np.empty(0, dtype=np.int64)
+
+    # Groups where some store is on both sides need the skip rule, so the walk
+    n_stores = int(store.max()) + 1
+    sending = _sorted_unique(group[senders].astype(np.int64) * n_stores + store[senders])
+    receiving = _sorted_unique(group[receivers].astype(np.int64) * n_stores + store[receivers])
+    conflicted = _sorted_unique(np.intersect1d(sending, receiving, assume_unique=True) // n_stores)
+    s_walk = np.isin(group[senders], conflicted)
+    r_walk = np.isin(group[receivers], conflicted)
+
+    parts = [_match_by_intervals(group, qty, senders[~s_walk], receivers[~r_walk])]
+    if s_walk.any():
+        parts.append(_match_sequentially(group, store, qty, senders[s_walk], receivers[r_walk]))
+    from_rows, to_rows, amounts = (np.concatenate(a) for a in zip(*parts))
+    order = np.lexsort((to_rows, from_rows))
+    return from_rows[order], to_rows[order], amounts[order]
+
+
+@stage(reads=["STORE_NAME", "Transfer in/out"], writes=[])
+def transfer_rows(filtered_df: pd.DataFrame, partition: str | None = None) -> tuple:
+    """``match_transfers`` on a filtered frame: positions of each transfer's sending and receiving rows."""
+    return match_transfers(sku_codes(filtered_df, partition), key_codes(filtered_df["STORE_NAME"]),
+                           filtered_df["Transfer in/out"].to_numpy(dtype=np.int64))
+
+
+def transfer_frame(filtered_df: pd.DataFrame, from_rows: np.ndarray, to_rows: np.ndarray, amounts: np.ndarray,
+                   partition: str | None = None) -> pd.DataFrame:
+    """
+    Build the transfer-details sheet from ``transfer_rows`` output.
+
+    Categorical columns stay categorical: names are only spelled out when
+    the sheet is exported.
+    """
+    keys = sku_keys(partition)
+    sent = filtered_df.iloc[from_rows]
+    transfers = pd.DataFrame({
+        **{c: sent[c].array for c in keys[1:] + ["UPC_Barcode_SKU"]},
+        "From Store": sent["STORE_NAME"].array,
+        "To Store": filtered_df["STORE_NAME"].array.take(to_rows),
+        **{c: sent[c].array for c in TRANSFER_COLUMNS},
+        "Quantity Transferred": amounts,
+    })
+    columns = keys[1:] + ["UPC_Barcode_SKU", "From Store", "To Store"] + TRANSFER_COLUMNS + ["Quantity Transferred"]
+    return transfers[columns]
+
+
+def process_transfer_details(filtered_df: pd.DataFrame, partition: str | None = None) -> pd.DataFrame:
+    """Match stores with surplus (``Transfer in/out`` < 0) to stores short of the same SKU; see ``match_transfers``."""
+    return transfer_frame(filtered_df, *transfer_rows(filtered_df, partition), partition)
+
+
+# ---------- LEAN ----------
+def split_passthrough(aggregated: pd.DataFrame, partition: str | None = None) -> tuple:
+    """
+    Return ``(narrow, passthrough)``: the columns some stage reads, and the descriptive rest.
+
+    ``DESIGN``, ``Size``, ``Color``, ``Volume`` and ``product_type`` are
+    part of the aggregate grain but no stage after aggregation reads them,
+    so they need not travel through the per-SKU stages and the filter.
+    Both frames keep ``aggregated``'s index for ``join_passthrough``.
+    """
+    keep = stage_reads() | set(sku_keys(partition))
+    passthrough = [c for c in aggregated.columns if c not in keep]
+    return aggregated.drop(columns=passthrough), aggregated[passthrough]
+
+
+def join_passthrough(filtered: pd.DataFrame, passthrough: pd.DataFrame, columns) -> pd.DataFrame:
+    """Put the pass-through columns back on the rows that survived, in the order of ``columns`` then the rest."""
+    joined = pd.concat([filtered, passthrough.loc[filtered.index]], axis=1)
+    columns = list(columns)
+    return joined[columns + [c for c in joined.columns if c not in columns]]
+
+
+# ---------- PARALLEL ----------
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    """
+    Return the process-wide worker pool, resized to ``workers`` if needed.
+
+    Workers are spawned rather than forked: Streamlit runs scripts on
+    threads, and forking a threaded process can deadlock the child.
+    """
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_workers = workers
+        return _executor
+
+
+def _to_ipc(df: pd.DataFrame) -> bytes:
+    # One Arrow buffer per column instead of pickling objects value by value
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _from_ipc(body: bytes) -> pd.DataFrame:
+    with pa.ipc.open_stream(pa.py_buffer(body)) as reader:
+        return reader.read_all().to_pandas()
+
+
+def _run_shard(body: bytes, partition, now: datetime) -> bytes:
+    """Worker side of ``_run_partitioned``; rows keep their ``_row`` labels."""
+    return _to_ipc(_sku_stage(_from_ipc(body), partition, now))
+
+
+def _run_partitioned(aggregated: pd.DataFrame, partition, now: datetime, workers: int) -> pd.DataFrame:
+    """
+    ``_sku_stage`` over SKU hash partitions in the worker pool.
+
+    The per-SKU columns only look within one SKU (and City/Zone), so
+    partitions are independent. Rows carry their position as ``_row`` so
+    the frame comes back in the order and with the index a single-process
+    run gives.
+    """
+    shard = pd.util.hash_pandas_object(aggregated["UPC_Barcode_SKU"], index=False).to_numpy() % workers
+    labelled = aggregated.assign(_row=np.arange(len(aggregated)))
+    executor = get_executor(workers)
+    futures = [executor.submit(_run_shard, _to_ipc(labelled[shard == k]), partition, now) for k in range(workers)]
+
+    df = pd.concat([_from_ipc(f.result()) for f in futures], ignore_index=True).sort_values("_row", kind="stable")
+    labels = df.pop("_row").to_numpy()
+    df.index = aggregated.index[labels]
+    return df
+
+
+# ---------- PIPELINE ----------
+def run_pipeline(data: pd.DataFrame, threshold_date, sell_through_threshold, days_threshold,
+                 partition: str | None = None, now: datetime | None = None, workers: int = 1,
+                 parallel_min_rows: int | None = PARALLEL_MIN_ROWS, cache: StageCache | None = None,
+                 stages: dict | None = None, profile: StageProfile | None = None, lean: bool = False) -> tuple:
+    """
+    Run every stage on loaded store data and return ``(filtered_data, transfer_details)``.
+
+    ``partition`` is ``None`` for Network, ``"City"`` or ``"Zone"``; see
+    ``PARTITIONS``. With ``workers`` > 1 and a ``parallel_min_rows``,
+    aggregated frames of at least that many rows get their per-SKU columns
+    computed in that many worker processes; the result is the same. Raises
+    ``PipelineError`` if a required column is missing.
+
+    With a ``cache``, stage outputs are memoized by the data's fingerprint
+    and the parameters each stage reads: changing only the thresholds reruns
+    ``filter`` and ``transfers``. Ages are counted from the first run of the
+    day whose per-SKU columns were reused. ``stages`` receives ``"hit"`` or
+    ``"run"`` for each stage.
+
+    A ``stage_profile.StageProfile`` records each stage's time, rows in and
+    out, and memory; ``fingerprint`` shows up as its own entry when a cache
+    is used.
+
+    ``lean=True`` runs the per-SKU stages and the filter on only the columns
+    the stages declare they read (see ``split_passthrough``) and joins the
+    descriptive columns back onto the surviving rows in a ``passthrough``
+    stage; the result is the same, with less memory held along the way.
+    """
+    now = now or datetime.now()
+    data_key = ""
+    if cache is not None:
+        with profiled(profile, "fingerprint", len(data)):
+            data_key = fingerprint(data)
+    runner = StageRunner(cache, data_key, stages, profile)
+
+    aggregated = runner.run("aggregate", (pd.Timestamp(threshold_date), partition),
+                            lambda: aggregate_data(data, threshold_date, partition), len(data))
+    _require(aggregated, aggregate_keys(partition) + QUANTITY_COLUMNS)
+    narrow, passthrough = split_passthrough(aggregated, partition) if lean else (aggregated, None)
+
+    # Only the per-SKU columns go to the workers: they are the same either way, so the threshold-dependent
+    # filter and transfers below stay separate memo entries in both modes
+    parallel = workers > 1 and parallel_min_rows is not None and len(narrow) >= parallel_min_rows
+    df = runner.run(
+        "sku_columns", (now.date(), lean),
+        lambda: _run_partitioned(narrow, partition, now, workers) if parallel else _sku_stage(narrow, partition, now),
+        len(narrow),
+    )
+    filtered = runner.run("filter", (sell_through_threshold, days_threshold),
+                          lambda: filter_data(df, sell_through_threshold, days_threshold), len(df))
+    if lean:
+        filtered = runner.run("passthrough", (),
+                              lambda: join_passthrough(filtered, passthrough, aggregated.columns), len(filtered))
+    transfers = runner.run("transfers", (), lambda: process_transfer_details(filtered, partition), len(filtered))
+    return filtered, transfers
+
+
+# ---------- CHUNKED ----------
+def _partial_aggregate(chunk: pd.DataFrame, threshold_date, partition) -> pd.DataFrame:
+    keys = aggregate_keys(partition)
+    partial = aggregate_data(chunk, threshold_date, partition)
+    _require(partial, keys + QUANTITY_COLUMNS)
+    return partial[keys + QUANTITY_COLUMNS]
+
+
+def _merge_partials(partials: list, partition) -> pd.DataFrame:
+    # Every key of the grain is a grouping key, so partial sums add up to the full sums
+    df = concat_store_frames(partials)
+    return df.groupby(aggregate_keys(partition), observed=True)[QUANTITY_COLUMNS].sum().reset_index()
+
+
+def aggregate_chunks(chunks, threshold_date, partition: str | None = None, max_bytes: int | None = None,
+                     stats: dict | None = None) -> pd.DataFrame:
+    """
+    ``aggregate_data`` over an iterable of row chunks, without holding the rows together.
+
+    Each chunk is summed to the grain on arrival and only the partial sums
+    are kept; they are merged (summed again) whenever they take up half of
+    ``max_bytes``, which leaves the other half for the chunk being read and
+    the merge itself. The per-SKU figures (design sell-through, cover, age)
+    are sums and minimums over the grain, so running the pipeline on the
+    result gives exactly what the in-memory path gives.
+
+    Raises ``MemoryBudgetError`` when a chunk plus the partials exceed
+    ``max_bytes`` or the merged aggregate alone needs more than half of it;
+    ``None`` means no budget. ``stats`` receives ``chunks``, ``rows``,
+    ``peak_bytes`` (largest accounted footprint) and ``aggregated_bytes``.
+    Returns an empty frame when there are no rows.
+    """
+    merged, merged_bytes = None, 0
+    pending, pending_bytes = [], 0
+    n_chunks = n_rows = peak = 0
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        chunk_bytes = frame_memory(chunk)
+        held = merged_bytes + pending_bytes + chunk_bytes
+        peak = max(peak, held)
+        if max_bytes is not None and held > max_bytes:
+            raise MemoryBudgetError(
+                f"A {chunk_bytes / 1e6:,.1f} MB chunk on top of {(held - chunk_bytes) / 1e6:,.1f} MB of "
+                f"partial sums exceeds the {max_bytes / 1e6:,.1f} MB budget; use smaller pages or a larger budget"
+            )
+        n_chunks += 1
+        n_rows += len(chunk)
+        partial = _partial_aggregate(chunk, threshold_date, partition)
+        del chunk
+        pending.append(partial)
+        pending_bytes += frame_memory(partial)
+
+        if max_bytes is not None and merged_bytes + pending_bytes > max_bytes // 2:
+            merged = _merge_partials(([merged] if merged is not None else []) + pending, partition)
+            merged_bytes, pending, pending_bytes = frame_memory(merged), [], 0
+            if merged_bytes > max_bytes // 2:
+                raise MemoryBudgetError(
+                    f"The aggregated rows alone take {merged_bytes / 1e6:,.1f} MB, more than half of the "
+                    f"{max_bytes / 1e6:,.1f} MB budget; narrow the filters or raise the budget"
+                )
+
+    parts = ([merged] if merged is not None else []) + pending
+    aggregated = _merge_partials(parts, partition) if parts else pd.DataFrame()
+    if stats is not None:
+        stats.update(chunks=n_chunks, rows=n_rows, peak_bytes=peak, aggregated_bytes=frame_memory(aggregated))
+    return aggregated
+
+
+def run_pipeline_chunked(chunks, threshold_date, sell_through_threshold, days_threshold,
+                         partition: str | None = None, max_bytes: int | None = None, stats: dict | None = None,
+                         **kwargs) -> tuple:
+    """
+    ``run_pipeline`` on row chunks: ``aggregate_chunks`` within ``max_bytes``, then every later stage.
+
+    Only the aggregated SKU x store frame is materialized. Other keyword
+    arguments go to ``run_pipeline``; the result is the same as running it on
+    the concatenated chunks.
+    """
+    with profiled(kwargs.get("profile"), "aggregate_chunks") as record:
+        aggregated = aggregate_chunks(chunks, threshold_date, partition, max_bytes, stats)
+        record["rows_out"] = len(aggregated)
+    return run_pipeline(aggregated, threshold_date, sell_through_threshold, days_threshold,
+                        partition=partition, **kwargs)
@@ -1,9 +1,10 @@
 # utils.py — use Flask API instead of direct SQL
 import os
 import sys
-import requests
 import streamlit as st
 
+from http_client import get_client
+
 # ---------- CONFIG ----------
 # We’ll read API base URL from Streamlit secrets if possible,
 # otherwise fall back to an environment variable / hard-coded value.
@@ -32,7 +33,7 @@ def _post(endpoint: str, payload: dict) -> dict:
     """Helper to call the Flask API."""
     url = f"{API_BASE}{endpoint}"
     try:
-        resp = requests.post(url, json=payload, timeout=10)
+        resp = get_client().post(url, json=payload)
         resp.raise_for_status()
         data = resp.json()
         return data